@@ -3,6 +3,7 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_bcrypt import Bcrypt
+from flask_migrate import Migrate
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -12,6 +13,7 @@ load_dotenv()
 db = SQLAlchemy()
 login_manager = LoginManager()
 bcrypt = Bcrypt()
+migrate = Migrate()
 
 def create_app():
     app = Flask(__name__)
@@ -47,10 +49,106 @@ def create_app():
     app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     
+    # Library pagination
+    app.config['LIBRARY_PAGE_SIZE'] = int(os.environ.get('LIBRARY_PAGE_SIZE', 24))
+    app.config['LIBRARY_MAX_PAGE_SIZE'] = int(os.environ.get('LIBRARY_MAX_PAGE_SIZE', 100))
+    app.config['LIBRARY_SEARCH_LIMIT'] = int(os.environ.get('LIBRARY_SEARCH_LIMIT', 50))
+    app.config['CHALLENGE_CANDIDATES_PAGE_SIZE'] = int(os.environ.get('CHALLENGE_CANDIDATES_PAGE_SIZE', 20))
+    
+    # JSON API list pagination (?limit= is capped at API_MAX_PAGE_SIZE)
+    app.config['API_PAGE_SIZE'] = int(os.environ.get('API_PAGE_SIZE', 50))
+    app.config['API_MAX_PAGE_SIZE'] = int(os.environ.get('API_MAX_PAGE_SIZE', 200))
+    # Seconds a bearer token from /api/v1/auth/token stays valid
+    app.config['API_TOKEN_MAX_AGE'] = int(os.environ.get('API_TOKEN_MAX_AGE', 30 * 24 * 3600))
+    
+    # Google Books API client
+    app.config['GOOGLE_BOOKS_API_KEY'] = os.environ.get('GOOGLE_BOOKS_API_KEY', '')
+    app.config['GOOGLE_BOOKS_API_URL'] = os.environ.get('GOOGLE_BOOKS_API_URL', 'https://www.googleapis.com/books/v1')
+    app.config['GOOGLE_BOOKS_CONNECT_TIMEOUT'] = float(os.environ.get('GOOGLE_BOOKS_CONNECT_TIMEOUT', 3.05))
+    app.config['GOOGLE_BOOKS_READ_TIMEOUT'] = float(os.environ.get('GOOGLE_BOOKS_READ_TIMEOUT', 10))
+    app.config['GOOGLE_BOOKS_MAX_RETRIES'] = int(os.environ.get('GOOGLE_BOOKS_MAX_RETRIES', 2))
+    app.config['GOOGLE_BOOKS_POOL_SIZE'] = int(os.environ.get('GOOGLE_BOOKS_POOL_SIZE', 10))
+    # Result pages of 40 fetched concurrently per search
+    app.config['GOOGLE_BOOKS_SEARCH_PAGES'] = int(os.environ.get('GOOGLE_BOOKS_SEARCH_PAGES', 4))
+    app.config['GOOGLE_BOOKS_BREAKER_THRESHOLD'] = int(os.environ.get('GOOGLE_BOOKS_BREAKER_THRESHOLD', 5))
+    app.config['GOOGLE_BOOKS_BREAKER_RESET'] = int(os.environ.get('GOOGLE_BOOKS_BREAKER_RESET', 30))
+    
+    # Google Books search result cache ('memory' or 'database' to share hits between workers)
+    app.config['SEARCH_CACHE_BACKEND'] = os.environ.get('SEARCH_CACHE_BACKEND', 'memory')
+    app.config['SEARCH_CACHE_TTL'] = int(os.environ.get('SEARCH_CACHE_TTL', 3600))
+    app.config['SEARCH_CACHE_SIZE'] = int(os.environ.get('SEARCH_CACHE_SIZE', 256))
+    
+    # Seconds before stored Google Books volume metadata is refetched
+    app.config['VOLUME_CACHE_MAX_AGE'] = int(os.environ.get('VOLUME_CACHE_MAX_AGE', 30 * 24 * 3600))
+    
+    # Opt-in SQL profiling per request; /_metrics also requires METRICS_TOKEN
+    app.config['QUERY_PROFILER_ENABLED'] = os.environ.get('QUERY_PROFILER_ENABLED', '0') == '1'
+    app.config['SLOW_QUERY_THRESHOLD_MS'] = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 100))
+    app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN', '')
+    
+    # Background jobs (JOB_WORKERS=0 leaves them to 'flask run-jobs'); backoff doubles per failed attempt
+    app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 2))
+    app.config['JOB_MAX_ATTEMPTS'] = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+    app.config['JOB_RETRY_BACKOFF'] = float(os.environ.get('JOB_RETRY_BACKOFF', 5))
+    app.config['JOB_RETRY_MAX_BACKOFF'] = float(os.environ.get('JOB_RETRY_MAX_BACKOFF', 3600))
+    app.config['JOB_POLL_INTERVAL'] = float(os.environ.get('JOB_POLL_INTERVAL', 2))
+    app.config['JOB_LEASE'] = int(os.environ.get('JOB_LEASE', 300))
+    
+    # Cover proxy: covers on these hosts are fetched once, cached on disk and served as thumbnails
+    app.config['COVER_PROXY_HOSTS'] = [
+        host.strip() for host in os.environ.get(
+            'COVER_PROXY_HOSTS', 'books.google.com,books.googleusercontent.com'
+        ).split(',') if host.strip()
+    ]
+    app.config['COVER_CACHE_DIR'] = os.environ.get('COVER_CACHE_DIR', '')  # Default: <instance>/covers
+    app.config['COVER_MAX_BYTES'] = int(os.environ.get('COVER_MAX_BYTES', 5 * 1024 * 1024))
+    app.config['COVER_MAX_AGE'] = int(os.environ.get('COVER_MAX_AGE', 365 * 24 * 3600))
+    # Let the front-end server send cover files: X-Sendfile (Apache/lighttpd) or an nginx internal location
+    app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE', '0') == '1'
+    app.config['COVER_ACCEL_REDIRECT_PREFIX'] = os.environ.get('COVER_ACCEL_REDIRECT_PREFIX', '')
+    
+    # Library imports: uploads wait in IMPORT_DIR (default <instance>/imports) and are written in batches
+    app.config['IMPORT_DIR'] = os.environ.get('IMPORT_DIR', '')
+    app.config['IMPORT_BATCH_SIZE'] = int(os.environ.get('IMPORT_BATCH_SIZE', 500))
+    # Library entries read per database round trip while streaming an export
+    app.config['EXPORT_BATCH_SIZE'] = int(os.environ.get('EXPORT_BATCH_SIZE', 500))
+    
+    # bcrypt cost (log2 rounds); hashes made at another cost are replaced at the user's next login
+    app.config['BCRYPT_LOG_ROUNDS'] = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    # Password hashing pool: PASSWORD_HASH_WORKERS threads (0: one per CPU) with at most PASSWORD_HASH_MAX_PENDING
+    # hashes queued or running (0: four per thread); requests wait PASSWORD_HASH_WAIT seconds for a slot, then get a 503
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', 0))
+    app.config['PASSWORD_HASH_MAX_PENDING'] = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 0))
+    app.config['PASSWORD_HASH_WAIT'] = float(os.environ.get('PASSWORD_HASH_WAIT', 2))
+    
+    # Signed-in user identities are reused for USER_CACHE_TTL seconds unless the session's claims say they changed
+    app.config['USER_CACHE_TTL'] = int(os.environ.get('USER_CACHE_TTL', 60))
+    app.config['USER_CACHE_SIZE'] = int(os.environ.get('USER_CACHE_SIZE', 1024))
+    
+    # Comma separated emails of users allowed to see the admin pages
+    app.config['ADMIN_EMAILS'] = {
+        email.strip().lower() for email in os.environ.get('ADMIN_EMAILS', '').split(',') if email.strip()
+    }
+    
     # Initialize extensions with app
     db.init_app(app)
     login_manager.init_app(app)
     bcrypt.init_app(app)
+    migrate.init_app(app, db)
+    
+    # Initialize services
+    from app.services import (
+        init_cover_cache, init_google_books, init_job_queue, init_library_search, init_query_profiler, init_search_cache,
+        init_password_hasher, init_user_cache
+    )
+    init_google_books(app)
+    init_search_cache(app)
+    init_library_search(app)
+    init_query_profiler(app)
+    init_job_queue(app)
+    init_cover_cache(app)
+    init_user_cache(app)
+    init_password_hasher(app)
     
     # Configure login
     login_manager.login_view = 'auth.login'
@@ -62,15 +160,23 @@ def create_app():
     from app.routes.books import books_bp
     from app.routes.challenges import challenges_bp
     from app.routes.profile import profile_bp
+    from app.routes.metrics import metrics_bp
+    from app.routes.admin import admin_bp
+    from app.routes.covers import covers_bp
+    from app.routes.api import api_bp
     
     app.register_blueprint(auth_bp)
     app.register_blueprint(main_bp)
     app.register_blueprint(books_bp)
     app.register_blueprint(challenges_bp)
     app.register_blueprint(profile_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(admin_bp)
+    app.register_blueprint(covers_bp)
+    app.register_blueprint(api_bp)
     
-    # Create tables if they don't exist
-    with app.app_context():
-        db.create_all()
+    # Register CLI commands
+    from app.commands import register_commands
+    register_commands(app)
     
     return app 
\ No newline at end of file
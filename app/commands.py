@@ -0,0 +1,172 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import click
+from sqlalchemy import bindparam, or_, select
+from app import db
+from app.models import Book, LibraryImport, Review, User, book_categories, render_review_html
+from app.services import (
+    LibraryImportError, create_import, get_job_queue, get_library_search, rebuild_rating_summaries,
+    rebuild_user_stats, run_import, verify_user_stats
+)
+
+def register_commands(app):
+    """Register maintenance commands with the Flask CLI"""
+    
+    @app.cli.command('backfill-categories')
+    @click.option('--batch-size', default=500, show_default=True, help='Books to process per commit.')
+    def backfill_categories(batch_size):
+        """Populate the normalized category index from Book.categories"""
+        indexed = db.session.query(book_categories.c.book_id)
+        books = Book.query.filter(
+            Book.categories.isnot(None),
+            Book.categories != '',
+            Book.id.notin_(indexed)
+        ).order_by(Book.id)
+        
+        processed = 0
+        last_id = 0
+        while True:
+            batch = books.filter(Book.id > last_id).limit(batch_size).all()
+            if not batch:
+                break
+            for book in batch:
+                book.set_categories(book.categories)
+            db.session.commit()
+            processed += len(batch)
+            last_id = batch[-1].id
+        
+        click.echo(f'Indexed categories for {processed} books.')
+    
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index():
+        """Rebuild the local full-text index over books and reviews"""
+        index = get_library_search()
+        if index is None:
+            raise click.ClickException('Library search is not supported on this database.')
+        count = index.rebuild()
+        click.echo(f'Indexed {count} books.')
+    
+    @app.cli.command('rebuild-user-stats')
+    def rebuild_user_stats_command():
+        """Recompute every user's reading stats summary from scratch"""
+        count = rebuild_user_stats()
+        click.echo(f'Rebuilt reading stats for {count} users.')
+    
+    @app.cli.command('verify-user-stats')
+    def verify_user_stats_command():
+        """Check the maintained reading stats summaries against a full recount"""
+        mismatched = verify_user_stats()
+        if mismatched:
+            raise click.ClickException(
+                f'Reading stats out of date for users: {", ".join(str(user_id) for user_id in mismatched)}. '
+                'Run "flask rebuild-user-stats" to fix them.'
+            )
+        click.echo('Reading stats are consistent.')
+    
+    @app.cli.command('rebuild-rating-summaries')
+    def rebuild_rating_summaries_command():
+        """Recompute every work's rating summary from its reviews"""
+        count = rebuild_rating_summaries()
+        click.echo(f'Rebuilt rating summaries for {count} works.')
+    
+    @app.cli.command('render-reviews')
+    @click.option('--batch-size', default=500, show_default=True, help='Reviews to render per commit.')
+    @click.option('--workers', default=os.cpu_count(), show_default=True, help='Rendering processes.')
+    @click.option('--all', 'render_all', is_flag=True, help='Re-render reviews whose stored HTML is current too.')
+    def render_reviews(batch_size, workers, render_all):
+        """Store the rendered HTML of reviews that have none or an out-of-date copy"""
+        reviews = Review.__table__
+        query = select(reviews.c.id, reviews.c.review_text, reviews.c.updated_at).order_by(reviews.c.id)
+        if not render_all:
+            query = query.where(or_(
+                reviews.c.review_html.is_(None),
+                reviews.c.review_html_updated_at.is_(None),
+                reviews.c.review_html_updated_at != reviews.c.updated_at
+            ))
+        # Skip reviews edited since they were read; keeping updated_at marks the HTML as current
+        store = reviews.update().where(
+            reviews.c.id == bindparam('review_id'),
+            reviews.c.updated_at == bindparam('stamp')
+        ).values(
+            review_html=bindparam('html'),
+            review_html_updated_at=bindparam('stamp'),
+            updated_at=bindparam('stamp')
+        )
+        
+        rendered = 0
+        last_id = 0
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while True:
+                with db.engine.connect() as connection:
+                    batch = connection.execute(query.where(reviews.c.id > last_id).limit(batch_size)).all()
+                if not batch:
+                    break
+                chunksize = max(1, len(batch) // (workers * 4))
+                html = pool.map(render_review_html, [row.review_text for row in batch], chunksize=chunksize)
+                with db.engine.begin() as connection:
+                    connection.execute(store, [
+                        {'review_id': row.id, 'html': row_html, 'stamp': row.updated_at}
+                        for row, row_html in zip(batch, html)
+                    ])
+                rendered += len(batch)
+                last_id = batch[-1].id
+        
+        click.echo(f'Rendered {rendered} reviews.')
+    
+    @app.cli.command('run-jobs')
+    @click.option('--once', is_flag=True, help='Run the jobs that are due now, then exit.')
+    def run_jobs(once):
+        """Process the background job queue in the foreground (for JOB_WORKERS=0 deployments)"""
+        queue = get_job_queue()
+        if once:
+            click.echo(f'Ran {queue.run_pending()} jobs.')
+            return
+        click.echo('Processing jobs, press Ctrl+C to stop.')
+        queue.work()
+    
+    @app.cli.command('import-goodreads')
+    @click.argument('email')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--batch-size', type=int, help='Rows to write per transaction (default IMPORT_BATCH_SIZE).')
+    def import_goodreads(email, path, batch_size):
+        """Import a Goodreads library export into a user's library"""
+        user = User.query.filter_by(email=email).first()
+        if user is None:
+            raise click.ClickException(f'No user with email {email}.')
+        try:
+            with open(path, 'rb') as source:
+                library_import = create_import(user.id, os.path.basename(path), source, queue=False)
+        except LibraryImportError as exc:
+            raise click.ClickException(str(exc))
+        _run_import(library_import, batch_size)
+    
+    @app.cli.command('resume-import')
+    @click.argument('import_id', type=int)
+    @click.option('--batch-size', type=int, help='Rows to write per transaction (default IMPORT_BATCH_SIZE).')
+    def resume_import_command(import_id, batch_size):
+        """Continue an interrupted library import from its last committed batch"""
+        library_import = db.session.get(LibraryImport, import_id)
+        if library_import is None:
+            raise click.ClickException(f'No import with id {import_id}.')
+        if library_import.status == 'done':
+            raise click.ClickException(f'Import {import_id} has already finished.')
+        _run_import(library_import, batch_size)
+    
+    def _run_import(library_import, batch_size):
+        import_id, total = library_import.id, library_import.total_rows
+        click.echo(f'Import {import_id}: {total} rows, starting at row {library_import.processed_rows}.')
+        try:
+            library_import = run_import(
+                import_id, batch_size,
+                progress=lambda processed: click.echo(f'  {processed}/{total} rows')
+            )
+        except Exception as exc:
+            raise click.ClickException(
+                f'Import {import_id} stopped: {exc}. Run "flask resume-import {import_id}" to continue it.'
+            )
+        if library_import.status != 'done':
+            click.echo(f'Import {import_id} is being continued by another run.')
+            return
+        click.echo(
+            f'Imported {library_import.imported_count} books, skipped {library_import.skipped_count} rows.'
+        )
@@ -1,3 +1,3 @@
 from app.forms.auth_forms import RegistrationForm, LoginForm, UpdateAccountForm, ChangePasswordForm
-from app.forms.book_forms import BookSearchForm, ManualBookAddForm, ReadingProgressForm, ReviewForm
+from app.forms.book_forms import BookSearchForm, LibraryImportForm, ManualBookAddForm, ReadingProgressForm, ReviewForm
 from app.forms.challenge_forms import CreateChallengeForm, UpdateChallengeForm 
\ No newline at end of file
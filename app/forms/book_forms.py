@@ -1,4 +1,5 @@
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileAllowed, FileField, FileRequired
 from wtforms import StringField, TextAreaField, SubmitField, SelectField, IntegerField, FloatField
 from wtforms.validators import DataRequired, Length, NumberRange, Optional, ValidationError
 
@@ -43,4 +44,8 @@ class ReadingProgressForm(FlaskForm):
 class ReviewForm(FlaskForm):
     rating = IntegerField('Rating (1-5)', validators=[DataRequired(), NumberRange(min=1, max=5)])
     review_text = TextAreaField('Your Review (Markdown supported)', validators=[Optional()])
-    submit = SubmitField('Submit Review') 
\ No newline at end of file
+    submit = SubmitField('Submit Review')
+
+class LibraryImportForm(FlaskForm):
+    file = FileField('Goodreads Library Export (CSV)', validators=[FileRequired(), FileAllowed(['csv'], 'Upload a CSV file.')])
+    submit = SubmitField('Import')
@@ -1,5 +1,12 @@
 from app.models.user import User
+from app.models.work import Work, get_cover_url
 from app.models.book import Book
+from app.models.category import Category, book_categories
 from app.models.reading_progress import ReadingProgress
+from app.models.user_stats import UserStats, UserMonthlyStats
 from app.models.challenge import Challenge, ChallengeBook
-from app.models.review import Review 
\ No newline at end of file
+from app.models.review import Review, render_review_html
+from app.models.rating_summary import RATINGS, RatingSummary, rating_summary_dict
+from app.models.search_cache import SearchCacheEntry
+from app.models.job import Job
+from app.models.library_import import LibraryImport
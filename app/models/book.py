@@ -1,56 +1,58 @@
 from datetime import datetime
 from app import db
-from markupsafe import Markup
-import bleach
+from app.models.category import Category, book_categories
 
-# Allowed HTML tags for sanitization
-ALLOWED_TAGS = ['p', 'br', 'b', 'i', 'em', 'strong', 'ul', 'ol', 'li', 'span']
-ALLOWED_ATTRIBUTES = {}
+def _work_attribute(name):
+    """Read-only access to a metadata field of the book's Work"""
+    return property(lambda self: getattr(self.work, name) if self.work is not None else None)
 
 class Book(db.Model):
+    """A book in one user's library; its metadata lives on the shared Work"""
     __tablename__ = 'books'
+    __table_args__ = (
+        # Not unique: existing libraries may already hold the same volume twice
+        db.Index('ix_books_work_id_user_id', 'work_id', 'user_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    title = db.Column(db.String(255), nullable=False)
-    authors = db.Column(db.String(255), nullable=False)
-    description = db.Column(db.Text, nullable=True)
-    avg_rating = db.Column(db.Float, nullable=True)
-    cover_image = db.Column(db.Text, nullable=True)
-    published_date = db.Column(db.String(20), nullable=True)
-    categories = db.Column(db.String(255), nullable=True)
-    page_count = db.Column(db.Integer, nullable=True)
-    google_books_id = db.Column(db.String(50), nullable=True)
+    work_id = db.Column(db.Integer, db.ForeignKey('works.id'), nullable=False)
+    categories = db.Column(db.String(255), nullable=True)  # The user's own categories for this book
     date_added = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     
     # Relationships
+    work = db.relationship('Work', backref='entries', lazy='joined', innerjoin=True)
     reading_progress = db.relationship('ReadingProgress', backref='book', lazy=True)
     reviews = db.relationship('Review', backref='book', lazy=True)
+    category_list = db.relationship('Category', secondary=book_categories, backref='books', lazy=True)
+    
+    # Shared metadata
+    title = _work_attribute('title')
+    authors = _work_attribute('authors')
+    description = _work_attribute('description')
+    avg_rating = _work_attribute('avg_rating')
+    cover_image = _work_attribute('cover_image')
+    published_date = _work_attribute('published_date')
+    page_count = _work_attribute('page_count')
+    google_books_id = _work_attribute('google_books_id')
     
     def __repr__(self):
         return f"Book('{self.title}', '{self.authors}')"
         
-    def get_avg_user_rating(self):
-        """Calculate the average rating from user reviews"""
-        reviews = Review.query.filter_by(book_id=self.id).all()
-        if not reviews:
-            return 0
+    def set_categories(self, categories):
+        """Set the display categories and keep the normalized category index in sync"""
+        names = Category.parse(categories)
+        self.categories = ', '.join(names)
+        self.category_list = Category.for_user(self.user_id, names)
         
-        total_rating = sum(review.rating for review in reviews)
-        return round(total_rating / len(reviews), 1)
+    def get_avg_user_rating(self):
+        """Average rating from every reader's review of this book's work"""
+        from app.services.ratings import get_rating_summary
+        return get_rating_summary(self.id)['average']
     
     def get_formatted_description(self):
         """Safely render HTML content from book description with XSS protection"""
-        if not self.description:
-            return ""
-        # Sanitize HTML to prevent XSS attacks
-        cleaned = bleach.clean(
-            self.description, 
-            tags=ALLOWED_TAGS, 
-            attributes=ALLOWED_ATTRIBUTES, 
-            strip=True
-        )
-        return Markup(cleaned)
+        return self.work.get_formatted_description()
     
     def to_dict(self):
         return {
@@ -62,5 +64,7 @@ class Book(db.Model):
             'cover_image': self.cover_image,
             'published_date': self.published_date,
             'categories': self.categories,
-            'page_count': self.page_count
-        } 
\ No newline at end of file
+            'page_count': self.page_count,
+            'google_books_id': self.google_books_id,
+            'date_added': self.date_added.isoformat() if self.date_added else None
+        } 
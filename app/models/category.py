@@ -0,0 +1,67 @@
+from app import db
+
+# Association table between books and their normalized categories
+book_categories = db.Table(
+    'book_categories',
+    db.Column('book_id', db.Integer, db.ForeignKey('books.id'), primary_key=True),
+    db.Column('category_id', db.Integer, db.ForeignKey('categories.id'), primary_key=True),
+    db.Index('ix_book_categories_category_id', 'category_id')
+)
+
+class Category(db.Model):
+    __tablename__ = 'categories'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'name', name='uq_categories_user_id_name'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    name = db.Column(db.String(255), nullable=False)
+    
+    def __repr__(self):
+        return f"Category('{self.name}')"
+    
+    @staticmethod
+    def parse(categories):
+        """Split a comma separated string (or list) into unique, trimmed category names"""
+        if not categories:
+            return []
+        if isinstance(categories, str):
+            categories = categories.split(',')
+        
+        names = []
+        for name in categories:
+            name = name.strip()
+            if name and name not in names:
+                names.append(name)
+        return names
+    
+    @staticmethod
+    def for_user(user_id, names):
+        """Return Category rows for the given names, creating any that don't exist yet"""
+        if not names:
+            return []
+        
+        existing = Category.query.filter(
+            Category.user_id == user_id,
+            Category.name.in_(names)
+        ).all()
+        by_name = {category.name: category for category in existing}
+        
+        categories = []
+        for name in names:
+            category = by_name.get(name)
+            if category is None:
+                category = Category(user_id=user_id, name=name)
+                db.session.add(category)
+                by_name[name] = category
+            categories.append(category)
+        return categories
+    
+    @staticmethod
+    def names_for_user(user_id):
+        """Return the sorted names of the categories used by a user's books"""
+        rows = db.session.query(Category.name).join(
+            book_categories, book_categories.c.category_id == Category.id
+        ).filter(Category.user_id == user_id).distinct().order_by(Category.name)
+        return [name for (name,) in rows]
@@ -1,8 +1,12 @@
 from datetime import datetime
+from sqlalchemy.exc import IntegrityError
 from app import db
 
 class Challenge(db.Model):
     __tablename__ = 'challenges'
+    __table_args__ = (
+        db.Index('ix_challenges_user_id_completed_end_date', 'user_id', 'completed', 'end_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -13,6 +17,8 @@ class Challenge(db.Model):
     title = db.Column(db.String(100), nullable=True)
     description = db.Column(db.Text, nullable=True)
     date_created = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Maintained by add_book/remove_book
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Many-to-many relationship with books
     completed_books = db.relationship('ChallengeBook', backref='challenge', lazy=True)
@@ -20,27 +26,47 @@ class Challenge(db.Model):
     def __repr__(self):
         return f"Challenge(Goal: {self.goal} books, End Date: {self.end_date})"
     
+    @staticmethod
+    def progress_for(goal, completed):
+        """Build the progress dict for a goal and number of completed books"""
+        return {
+            'completed': completed,
+            'total': goal,
+            'percentage': int((completed / goal) * 100) if goal > 0 else 0
+        }
+    
     def get_progress(self):
         """Return the progress as a percentage"""
-        completed = len(self.completed_books)
+        return Challenge.progress_for(self.goal, self.completed_count or 0)
+    
+    def to_dict(self):
         return {
-            'completed': completed,
-            'total': self.goal,
-            'percentage': int((completed / self.goal) * 100) if self.goal > 0 else 0
+            'id': self.id,
+            'title': self.title,
+            'description': self.description,
+            'goal': self.goal,
+            'start_date': self.start_date.isoformat(),
+            'end_date': self.end_date.isoformat(),
+            'completed': bool(self.completed),
+            'completed_count': self.completed_count or 0,
+            'progress': self.get_progress(),
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
     
     def add_book(self, book_id):
         """Add a book to the challenge's completed books"""
-        # Check if book is already added
-        existing = ChallengeBook.query.filter_by(challenge_id=self.id, book_id=book_id).first()
-        if existing:
+        # The unique constraint on (challenge_id, book_id) rejects duplicates
+        try:
+            with db.session.begin_nested():
+                db.session.add(ChallengeBook(challenge_id=self.id, book_id=book_id))
+        except IntegrityError:
             return False
-            
-        challenge_book = ChallengeBook(challenge_id=self.id, book_id=book_id)
-        db.session.add(challenge_book)
+        
+        self.completed_count = Challenge.completed_count + 1
+        db.session.flush()
         
         # Check if challenge is completed
-        if len(self.completed_books) + 1 >= self.goal:
+        if self.completed_count >= self.goal:
             self.completed = True
             
         return True
@@ -50,17 +76,35 @@ class Challenge(db.Model):
         challenge_book = ChallengeBook.query.filter_by(challenge_id=self.id, book_id=book_id).first()
         if challenge_book:
             db.session.delete(challenge_book)
-            self.completed = False
+            # Both columns are set in one UPDATE, so completed compares the count from before the removal
+            self.completed_count = Challenge.completed_count - 1
+            self.completed = Challenge.completed_count - 1 >= Challenge.goal
             return True
         return False
+    
+    @staticmethod
+    def remove_book_from_all(book_id):
+        """Remove a book from every challenge it counts towards"""
+        challenge_ids = db.session.query(ChallengeBook.challenge_id).filter(ChallengeBook.book_id == book_id)
+        Challenge.query.filter(Challenge.id.in_(challenge_ids)).update({
+            Challenge.completed_count: Challenge.completed_count - 1,
+            Challenge.completed: Challenge.completed_count - 1 >= Challenge.goal
+        }, synchronize_session=False)
+        ChallengeBook.query.filter_by(book_id=book_id).delete(synchronize_session=False)
 
 class ChallengeBook(db.Model):
     __tablename__ = 'challenge_books'
+    __table_args__ = (
+        db.UniqueConstraint('challenge_id', 'book_id', name='uq_challenge_books_challenge_id_book_id'),
+        db.Index('ix_challenge_books_book_id', 'book_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     challenge_id = db.Column(db.Integer, db.ForeignKey('challenges.id'), nullable=False)
     book_id = db.Column(db.Integer, db.ForeignKey('books.id'), nullable=False)
     date_added = db.Column(db.DateTime, default=datetime.utcnow)
     
+    book = db.relationship('Book', lazy=True)
+    
     def __repr__(self):
         return f"ChallengeBook(Challenge ID: {self.challenge_id}, Book ID: {self.book_id})" 
\ No newline at end of file
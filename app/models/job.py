@@ -0,0 +1,37 @@
+from datetime import datetime
+from app import db
+
+class Job(db.Model):
+    """A unit of background work, stored so queued work survives restarts"""
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        # One job per kind and key, e.g. one enrichment job per google_books_id
+        db.UniqueConstraint('kind', 'key', name='uq_jobs_kind_key'),
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    key = db.Column(db.String(100), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    enqueued_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Latest (re-)enqueue
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Not picked up before this
+    started_at = db.Column(db.DateTime, nullable=True)  # Latest attempt, also the worker's lease
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f"Job('{self.kind}', '{self.key}', '{self.status}')"
+    
+    def requeue(self, now=None):
+        """Make a finished job run again from scratch"""
+        now = now or datetime.utcnow()
+        self.status = 'pending'
+        self.attempts = 0
+        self.last_error = None
+        self.enqueued_at = now
+        self.run_at = now
+        self.started_at = None
+        self.finished_at = None
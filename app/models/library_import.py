@@ -0,0 +1,41 @@
+from datetime import datetime
+from app import db
+
+class LibraryImport(db.Model):
+    """A CSV library export being imported in batches; processed_rows is where a resumed run picks up"""
+    __tablename__ = 'library_imports'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    filename = db.Column(db.String(255), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, done, failed
+    total_rows = db.Column(db.Integer, nullable=False, default=0)
+    processed_rows = db.Column(db.Integer, nullable=False, default=0)  # Rows committed so far, in file order
+    imported_count = db.Column(db.Integer, nullable=False, default=0)
+    skipped_count = db.Column(db.Integer, nullable=False, default=0)  # Duplicates and rows without a title
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f"LibraryImport('{self.filename}', {self.processed_rows}/{self.total_rows}, '{self.status}')"
+    
+    @property
+    def percent(self):
+        if not self.total_rows:
+            return 100 if self.status == 'done' else 0
+        return min(100, int(self.processed_rows * 100 / self.total_rows))
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'status': self.status,
+            'total_rows': self.total_rows,
+            'processed_rows': self.processed_rows,
+            'imported_count': self.imported_count,
+            'skipped_count': self.skipped_count,
+            'percent': self.percent,
+            'error': self.error
+        }
@@ -0,0 +1,40 @@
+from datetime import datetime
+from app import db
+
+# Star ratings a review can carry
+RATINGS = (1, 2, 3, 4, 5)
+
+class RatingSummary(db.Model):
+    """Review count, rating sum and star histogram for a work, kept up to date as reviews change"""
+    __tablename__ = 'rating_summaries'
+    
+    work_id = db.Column(db.Integer, db.ForeignKey('works.id'), primary_key=True)
+    review_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rating_1 = db.Column(db.Integer, nullable=False, default=0)
+    rating_2 = db.Column(db.Integer, nullable=False, default=0)
+    rating_3 = db.Column(db.Integer, nullable=False, default=0)
+    rating_4 = db.Column(db.Integer, nullable=False, default=0)
+    rating_5 = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"RatingSummary(Work ID: {self.work_id}, Reviews: {self.review_count})"
+    
+    @staticmethod
+    def histogram_column(rating):
+        return f'rating_{rating}'
+    
+    def to_dict(self):
+        return rating_summary_dict(
+            self.review_count, self.rating_sum,
+            {rating: getattr(self, self.histogram_column(rating)) for rating in RATINGS}
+        )
+
+def rating_summary_dict(count, total, histogram):
+    """Shape a summary for templates: count, average (one decimal) and the star histogram"""
+    return {
+        'count': count,
+        'average': round(total / count, 1) if count else 0,
+        'histogram': histogram
+    }
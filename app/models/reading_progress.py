@@ -3,6 +3,12 @@ from app import db
 
 class ReadingProgress(db.Model):
     __tablename__ = 'reading_progress'
+    __table_args__ = (
+        db.Index('ix_reading_progress_user_id_status_last_updated', 'user_id', 'status', 'last_updated'),
+        db.Index('ix_reading_progress_user_id_status_end_date', 'user_id', 'status', 'end_date'),
+        db.Index('ix_reading_progress_user_id_last_updated', 'user_id', 'last_updated'),
+        db.Index('ix_reading_progress_book_id_user_id', 'book_id', 'user_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -45,4 +51,16 @@ class ReadingProgress(db.Model):
             if self.progress_type == 'percentage':
                 self.progress = 100
             
-        self.last_updated = datetime.utcnow() 
\ No newline at end of file
+        self.last_updated = datetime.utcnow()
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'book_id': self.book_id,
+            'status': self.status,
+            'progress': self.progress,
+            'progress_type': self.progress_type,
+            'start_date': self.start_date.isoformat() if self.start_date else None,
+            'end_date': self.end_date.isoformat() if self.end_date else None,
+            'last_updated': self.last_updated.isoformat() if self.last_updated else None
+        }
@@ -1,6 +1,7 @@
 from datetime import datetime
 import markdown
 import bleach
+from sqlalchemy import event
 from app import db
 
 # Allowed HTML tags for markdown output sanitization
@@ -12,8 +13,25 @@ ALLOWED_ATTRIBUTES = {
     'a': ['href', 'title'],
 }
 
+def render_review_html(review_text):
+    """Convert review Markdown to sanitized HTML (module level so a process pool can run it)"""
+    if not review_text:
+        return ""
+    # Convert markdown to HTML
+    html = markdown.markdown(review_text)
+    # Sanitize HTML to prevent XSS attacks
+    return bleach.clean(
+        html, 
+        tags=ALLOWED_TAGS, 
+        attributes=ALLOWED_ATTRIBUTES, 
+        strip=True
+    )
+
 class Review(db.Model):
     __tablename__ = 'reviews'
+    __table_args__ = (
+        db.UniqueConstraint('book_id', 'user_id', name='uq_reviews_book_id_user_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -22,21 +40,47 @@ class Review(db.Model):
     review_text = db.Column(db.Text, nullable=True)
     timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    review_html = db.Column(db.Text, nullable=True)  # Rendered review_text, current while it matches updated_at
+    review_html_updated_at = db.Column(db.DateTime, nullable=True)
     
     def __repr__(self):
         return f"Review(Book ID: {self.book_id}, Rating: {self.rating})"
     
+    def has_current_html(self):
+        """Whether review_html was rendered from the current review_text"""
+        return self.review_html is not None and self.review_html_updated_at == self.updated_at
+    
+    def render_html(self):
+        """Render review_text into review_html and stamp it with updated_at"""
+        self.updated_at = datetime.utcnow()
+        self.review_html = render_review_html(self.review_text)
+        self.review_html_updated_at = self.updated_at
+    
     def get_formatted_review(self):
-        """Convert Markdown to HTML for display with XSS protection"""
-        if not self.review_text:
-            return ""
-        # Convert markdown to HTML
-        html = markdown.markdown(self.review_text)
-        # Sanitize HTML to prevent XSS attacks
-        cleaned = bleach.clean(
-            html, 
-            tags=ALLOWED_TAGS, 
-            attributes=ALLOWED_ATTRIBUTES, 
-            strip=True
-        )
-        return cleaned 
\ No newline at end of file
+        """Return the review as sanitized HTML, rendering only if the stored copy is out of date"""
+        if self.has_current_html():
+            return self.review_html
+        return render_review_html(self.review_text)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'book_id': self.book_id,
+            'rating': self.rating,
+            'review_text': self.review_text,
+            'review_html': self.get_formatted_review(),
+            'timestamp': self.timestamp.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
+
+@event.listens_for(Review, 'before_insert')
+def _render_new_review(mapper, connection, target):
+    target.render_html()
+
+@event.listens_for(Review, 'before_update')
+def _render_changed_review(mapper, connection, target):
+    if db.inspect(target).attrs.review_text.history.has_changes() or not target.has_current_html():
+        target.render_html()
+    else:
+        # Other edits leave the text alone, so keep the stored HTML current
+        target.updated_at = target.review_html_updated_at = datetime.utcnow()
@@ -0,0 +1,15 @@
+from datetime import datetime
+from app import db
+
+class SearchCacheEntry(db.Model):
+    """Shared cache of Google Books search results, keyed by normalized query"""
+    __tablename__ = 'search_cache'
+    
+    cache_key = db.Column(db.String(64), primary_key=True)  # sha256 of the normalized query
+    query = db.Column(db.String(255), nullable=False)
+    results = db.Column(db.Text, nullable=False)  # JSON encoded result list
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f"SearchCacheEntry('{self.query}', expires {self.expires_at})"
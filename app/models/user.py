@@ -1,13 +1,33 @@
 from datetime import datetime
+from flask import current_app
 from flask_login import UserMixin
-from app import db, login_manager, bcrypt
-from app.models.reading_progress import ReadingProgress
+from app import db, login_manager
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # Served from the user cache while it agrees with the session's claims
+    from app.services.user_cache import load_session_user
+    return load_session_user(int(user_id))
 
-class User(db.Model, UserMixin):
+@login_manager.request_loader
+def load_api_user(request):
+    # Bearer tokens sign in JSON API requests only; pages keep using the session cookie
+    from app.services.api_tokens import load_request_token_user
+    return load_request_token_user(request)
+
+class AccountMixin(UserMixin):
+    """Behaviour shared by User rows and the cached identity of the signed-in user"""
+    
+    @property
+    def is_admin(self):
+        return self.email.lower() in current_app.config['ADMIN_EMAILS']
+    
+    def get_reading_stats(self):
+        # Calculate reading statistics
+        from app.services.stats import get_reading_stats
+        return get_reading_stats(self.id)
+
+class User(db.Model, AccountMixin):
     __tablename__ = 'users'
     
     id = db.Column(db.Integer, primary_key=True)
@@ -16,6 +36,8 @@ class User(db.Model, UserMixin):
     password = db.Column(db.String(128), nullable=False)
     profile_pic = db.Column(db.String(255), nullable=True, default='default.jpg')
     date_joined = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Bumped by account and password changes so cached session identities are reloaded
+    session_version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     
     # Relationships
     books = db.relationship('Book', backref='owner', lazy=True)
@@ -24,31 +46,20 @@ class User(db.Model, UserMixin):
     reviews = db.relationship('Review', backref='reviewer', lazy=True)
     
     def set_password(self, password):
-        self.password = bcrypt.generate_password_hash(password).decode('utf-8')
+        # Hashed on the bounded bcrypt pool; raises PasswordHasherBusy when it is saturated
+        from app.services.passwords import get_password_hasher
+        self.password = get_password_hasher().hash(password)
         
     def check_password(self, password):
-        return bcrypt.check_password_hash(self.password, password)
+        from app.services.passwords import get_password_hasher
+        return get_password_hasher().verify(self.password, password)
     
-    def get_reading_stats(self):
-        # Calculate reading statistics
-        books_read = ReadingProgress.query.filter(
-            ReadingProgress.user_id == self.id,
-            (ReadingProgress.status == 'finished') | (ReadingProgress.status == 'read')
-        ).count()
-        
-        books_reading = ReadingProgress.query.filter_by(user_id=self.id, status='reading').count()
-        
-        books_to_read = ReadingProgress.query.filter(
-            ReadingProgress.user_id == self.id,
-            (ReadingProgress.status == 'want_to_read') | (ReadingProgress.status == 'to-read')
-        ).count()
-        
-        return {
-            'read': books_read,
-            'reading': books_reading,
-            'to_read': books_to_read,
-            'total': books_read + books_reading + books_to_read
-        }
+    def password_needs_rehash(self):
+        from app.services.passwords import get_password_hasher
+        return get_password_hasher().needs_rehash(self.password)
+    
+    def bump_session_version(self):
+        self.session_version = (self.session_version or 0) + 1
         
     def __repr__(self):
         return f"User('{self.username}', '{self.email}')" 
\ No newline at end of file
@@ -0,0 +1,38 @@
+from datetime import datetime
+from app import db
+
+class UserStats(db.Model):
+    """Per-user reading summary, kept up to date as reading progress changes"""
+    __tablename__ = 'user_stats'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    read_count = db.Column(db.Integer, nullable=False, default=0)
+    reading_count = db.Column(db.Integer, nullable=False, default=0)
+    to_read_count = db.Column(db.Integer, nullable=False, default=0)
+    pages_read = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"UserStats(User ID: {self.user_id}, Read: {self.read_count})"
+    
+    def to_dict(self):
+        return {
+            'read': self.read_count,
+            'reading': self.reading_count,
+            'to_read': self.to_read_count,
+            'total': self.read_count + self.reading_count + self.to_read_count,
+            'pages_read': self.pages_read
+        }
+
+class UserMonthlyStats(db.Model):
+    """Books and pages finished by a user in one calendar month"""
+    __tablename__ = 'user_monthly_stats'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    finished_count = db.Column(db.Integer, nullable=False, default=0)
+    pages_read = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"UserMonthlyStats(User ID: {self.user_id}, {self.year}-{self.month:02d}: {self.finished_count})"
@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta
+import hashlib
+import json
+from sqlalchemy import event
+from markupsafe import Markup
+import bleach
+from app import db
+
+# Allowed HTML tags for sanitization
+ALLOWED_TAGS = ['p', 'br', 'b', 'i', 'em', 'strong', 'ul', 'ol', 'li', 'span']
+ALLOWED_ATTRIBUTES = {}
+
+def sanitizer_version(tags, attributes):
+    """Fingerprint a sanitizer config so HTML stored under a different one is re-sanitized"""
+    config = json.dumps(
+        [sorted(tags), {tag: sorted(names) for tag, names in attributes.items()}, bleach.__version__],
+        sort_keys=True
+    )
+    return hashlib.sha1(config.encode()).hexdigest()[:16]
+
+# Changes whenever ALLOWED_TAGS, ALLOWED_ATTRIBUTES or the bleach release change
+DESCRIPTION_SANITIZER_VERSION = sanitizer_version(ALLOWED_TAGS, ALLOWED_ATTRIBUTES)
+
+def sanitize_description(description):
+    """Sanitize description HTML to prevent XSS attacks"""
+    if not description:
+        return ""
+    return bleach.clean(
+        description,
+        tags=ALLOWED_TAGS,
+        attributes=ALLOWED_ATTRIBUTES,
+        strip=True
+    )
+
+class Work(db.Model):
+    """Canonical book metadata shared by every user's library entry.
+    
+    Google Books volumes have one Work per google_books_id; manually added books
+    get a Work of their own with no google_books_id.
+    """
+    __tablename__ = 'works'
+    __table_args__ = (
+        db.UniqueConstraint('google_books_id', name='uq_works_google_books_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    google_books_id = db.Column(db.String(50), nullable=True)
+    title = db.Column(db.String(255), nullable=False)
+    authors = db.Column(db.String(255), nullable=False)
+    description = db.Column(db.Text, nullable=True)
+    description_html = db.Column(db.Text, nullable=True)  # Sanitized description, see DESCRIPTION_SANITIZER_VERSION
+    description_sanitizer = db.Column(db.String(16), nullable=True)
+    avg_rating = db.Column(db.Float, nullable=True)
+    cover_image = db.Column(db.Text, nullable=True)
+    cover_digest = db.Column(db.String(64), nullable=True)  # sha256 of the cached cover, see services/covers.py
+    published_date = db.Column(db.String(20), nullable=True)
+    categories = db.Column(db.Text, nullable=True)  # comma separated, as returned by Google Books
+    page_count = db.Column(db.Integer, nullable=True)
+    fetched_at = db.Column(db.DateTime, nullable=True)  # Last Google Books fetch, None for manual works
+    
+    def __repr__(self):
+        return f"Work('{self.google_books_id}', '{self.title}')"
+    
+    @property
+    def is_placeholder(self):
+        """True for a Google Books work recorded before its details were fetched"""
+        return self.google_books_id is not None and self.fetched_at is None
+    
+    def is_stale(self, max_age):
+        """Return True if the Google Books metadata is missing or older than max_age seconds"""
+        return self.fetched_at is None or self.fetched_at < datetime.utcnow() - timedelta(seconds=max_age)
+    
+    def update_from_api(self, item):
+        """Copy metadata from a Google Books volume resource"""
+        volume_info = item.get('volumeInfo', {})
+        self.title = volume_info.get('title', 'Unknown Title')[:255]
+        self.authors = ', '.join(volume_info.get('authors', ['Unknown Author']))[:255]
+        self.description = volume_info.get('description', '')
+        self.avg_rating = volume_info.get('averageRating', 0)
+        self.published_date = volume_info.get('publishedDate', '')[:20]
+        self.categories = ', '.join(volume_info.get('categories', []))
+        self.page_count = volume_info.get('pageCount', 0)
+        self.cover_image = get_cover_url(volume_info)
+        self.fetched_at = datetime.utcnow()
+    
+    def set_description(self, description, html=None):
+        """Set the description along with its sanitized HTML (pass html if it was already sanitized)"""
+        self.description = description
+        self.description_html = sanitize_description(description) if html is None else html
+        self.description_sanitizer = DESCRIPTION_SANITIZER_VERSION
+    
+    def has_current_description_html(self):
+        """Whether description_html was produced by the current sanitizer config"""
+        return self.description_html is not None and self.description_sanitizer == DESCRIPTION_SANITIZER_VERSION
+    
+    def refresh_description(self):
+        """Sanitize and store a missing or out-of-date description_html, returning True if it changed"""
+        if self.has_current_description_html():
+            return False
+        self.set_description(self.description)
+        return True
+    
+    def get_formatted_description(self):
+        """Safely render HTML content from the description with XSS protection"""
+        if self.has_current_description_html():
+            return Markup(self.description_html)
+        return Markup(sanitize_description(self.description))
+
+@event.listens_for(Work.description, 'set')
+def _description_changed(target, value, oldvalue, initiator):
+    # Stored HTML belongs to the old text; it is re-sanitized when next needed
+    if value != oldvalue:
+        target.description_html = None
+
+@event.listens_for(Work.cover_image, 'set')
+def _cover_changed(target, value, oldvalue, initiator):
+    # The cached image belongs to the old URL; the new one is fetched on next request
+    if value != oldvalue:
+        target.cover_digest = None
+
+def get_cover_url(volume_info):
+    """Pick the cover image URL from a Google Books volumeInfo block"""
+    if 'imageLinks' not in volume_info:
+        return None
+    
+    cover_url = volume_info['imageLinks'].get('thumbnail')
+    # Make sure the cover URL isn't too long
+    if cover_url and len(cover_url) > 1000:  # Set a reasonable limit for safety
+        # Try to use a smaller image if available
+        if 'smallThumbnail' in volume_info['imageLinks']:
+            cover_url = volume_info['imageLinks'].get('smallThumbnail')
+    return cover_url
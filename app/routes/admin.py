@@ -0,0 +1,32 @@
+from functools import wraps
+from flask import Blueprint, abort, render_template
+from flask_login import current_user, login_required
+from app.models import Job
+from app.services import get_job_queue
+
+admin_bp = Blueprint('admin', __name__)
+
+# Failed jobs listed on the queue page
+RECENT_FAILURES = 20
+
+def admin_required(view):
+    """Only let users listed in ADMIN_EMAILS through; everyone else gets a 404"""
+    @wraps(view)
+    @login_required
+    def wrapped(*args, **kwargs):
+        if not current_user.is_admin:
+            abort(404)
+        return view(*args, **kwargs)
+    return wrapped
+
+@admin_bp.route('/admin/jobs')
+@admin_required
+def jobs():
+    queue = get_job_queue()
+    failures = Job.query.filter_by(status='failed').order_by(Job.finished_at.desc()).limit(RECENT_FAILURES).all()
+    
+    return render_template('admin/jobs.html',
+                          title='Background Jobs',
+                          stats=queue.stats(),
+                          workers=queue.workers,
+                          failures=failures)
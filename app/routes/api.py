@@ -0,0 +1,291 @@
+import base64
+import binascii
+import hashlib
+from datetime import datetime
+from functools import wraps
+from flask import Blueprint, Response, current_app, jsonify, request
+from flask_login import current_user
+from app import db
+from app.models import Book, Challenge, ChallengeBook, ReadingProgress, Review, User, UserMonthlyStats, Work
+from app.services import PasswordHasherBusy, get_user_stats, issue_api_token
+
+api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+# Fields each resource can be trimmed to with ?fields=a,b (id is always included)
+BOOK_FIELDS = (
+    'title', 'authors', 'description', 'avg_rating', 'cover_image', 'published_date', 'categories', 'page_count',
+    'google_books_id', 'date_added'
+)
+PROGRESS_FIELDS = ('book_id', 'status', 'progress', 'progress_type', 'start_date', 'end_date', 'last_updated')
+REVIEW_FIELDS = ('book_id', 'rating', 'review_text', 'review_html', 'timestamp', 'updated_at')
+CHALLENGE_FIELDS = (
+    'title', 'description', 'goal', 'start_date', 'end_date', 'completed', 'completed_count', 'progress',
+    'updated_at', 'book_ids'
+)
+
+class ApiError(Exception):
+    """Raised by API helpers to answer with a JSON error"""
+    
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+@api_bp.errorhandler(ApiError)
+def _api_error(exc):
+    return jsonify({'error': exc.message}), exc.status
+
+@api_bp.errorhandler(PasswordHasherBusy)
+def _password_hasher_busy(exc):
+    response = jsonify({'error': 'Too many sign-ins are being processed right now. Please try again in a moment.'})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+def api_login_required(view):
+    """Like login_required, but answers with a 401 JSON error instead of redirecting to the login page.
+    
+    Requests are signed in by the session cookie or by an Authorization: Bearer token from /auth/token.
+    """
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        if not current_user.is_authenticated:
+            raise ApiError(401, 'Authentication required')
+        return view(*args, **kwargs)
+    return wrapped
+
+def _requested_fields(allowed):
+    """The fields asked for with ?fields=, or None for all of them"""
+    value = request.args.get('fields')
+    if not value:
+        return None
+    fields = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = fields - set(allowed) - {'id'}
+    if unknown:
+        raise ApiError(400, f'Unknown fields: {", ".join(sorted(unknown))}. Available: {", ".join(allowed)}')
+    return fields
+
+def _trim(data, fields):
+    if fields is None:
+        return data
+    return {name: value for name, value in data.items() if name == 'id' or name in fields}
+
+def _etag(*parts):
+    """Opaque validator for a representation, hashed from the row stamps it was built from"""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+def _conditional(etag, build):
+    """304 when the client already has this representation; only otherwise is build() called to serialize it"""
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    # Clients keep the body but check back with the ETag before reusing it
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+def _encode_cursor(last_id):
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip('=')
+
+def _decode_cursor(cursor):
+    if not cursor:
+        return 0
+    try:
+        return int(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ApiError(400, 'Invalid cursor')
+
+def _page_stamps(stamp_query, id_column):
+    """Keyset page of (id, stamp...) rows after ?cursor=, returning (rows, next_cursor)"""
+    limit = request.args.get('limit', current_app.config['API_PAGE_SIZE'], type=int)
+    limit = max(1, min(limit, current_app.config['API_MAX_PAGE_SIZE']))
+    
+    rows = stamp_query.filter(id_column > _decode_cursor(request.args.get('cursor'))).order_by(
+        id_column
+    ).limit(limit + 1).all()
+    next_cursor = _encode_cursor(rows[limit - 1][0]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+def _list_response(name, stamps, next_cursor, fields, load, serialize):
+    """Paginated list whose ETag covers the stamps of every row on the page"""
+    etag = _etag(name, sorted(fields or ()), next_cursor, [tuple(row) for row in stamps])
+    
+    def build():
+        ids = [row[0] for row in stamps]
+        items = {item.id: item for item in load(ids)} if ids else {}
+        return {
+            'data': [_trim(serialize(items[item_id]), fields) for item_id in ids if item_id in items],
+            'next_cursor': next_cursor
+        }
+    return _conditional(etag, build)
+
+# Authentication
+
+@api_bp.route('/auth/token', methods=['POST'])
+def token():
+    """Exchange a JSON {"email", "password"} for a bearer token"""
+    data = request.get_json(silent=True) or {}
+    email = data.get('email')
+    password = data.get('password')
+    if not isinstance(email, str) or not isinstance(password, str) or not email or not password:
+        raise ApiError(400, 'email and password are required')
+    
+    user = User.query.filter_by(email=email).first()
+    if user is None or not user.check_password(password):
+        raise ApiError(401, 'Invalid email or password')
+    if user.password_needs_rehash():
+        # BCRYPT_LOG_ROUNDS changed since this hash was made
+        user.set_password(password)
+        db.session.commit()
+    
+    response = jsonify({
+        'token': issue_api_token(user),
+        'token_type': 'Bearer',
+        'expires_in': current_app.config['API_TOKEN_MAX_AGE']
+    })
+    response.cache_control.no_store = True
+    return response
+
+# Books
+
+def _book_stamps():
+    # Work.fetched_at changes whenever Google Books metadata is refreshed
+    return db.session.query(Book.id, Book.date_added, Book.categories, Work.fetched_at).join(Book.work).filter(
+        Book.user_id == current_user.id
+    )
+
+@api_bp.route('/books')
+@api_login_required
+def books():
+    fields = _requested_fields(BOOK_FIELDS)
+    stamps, next_cursor = _page_stamps(_book_stamps(), Book.id)
+    return _list_response('books', stamps, next_cursor, fields,
+                          lambda ids: Book.query.filter(Book.id.in_(ids)), Book.to_dict)
+
+@api_bp.route('/books/<int:book_id>')
+@api_login_required
+def book(book_id):
+    fields = _requested_fields(BOOK_FIELDS)
+    stamp = _book_stamps().filter(Book.id == book_id).first()
+    if stamp is None:
+        raise ApiError(404, 'Book not found')
+    return _conditional(_etag('book', sorted(fields or ()), tuple(stamp)),
+                        lambda: _trim(db.session.get(Book, book_id).to_dict(), fields))
+
+# Reading progress
+
+def _progress_stamps():
+    return db.session.query(
+        ReadingProgress.id, ReadingProgress.last_updated, ReadingProgress.status, ReadingProgress.progress
+    ).filter(ReadingProgress.user_id == current_user.id)
+
+@api_bp.route('/progress')
+@api_login_required
+def progress_list():
+    fields = _requested_fields(PROGRESS_FIELDS)
+    query = _progress_stamps()
+    status = request.args.get('status')
+    if status:
+        query = query.filter(ReadingProgress.status == status)
+    stamps, next_cursor = _page_stamps(query, ReadingProgress.id)
+    return _list_response(f'progress:{status}', stamps, next_cursor, fields,
+                          lambda ids: ReadingProgress.query.filter(ReadingProgress.id.in_(ids)),
+                          ReadingProgress.to_dict)
+
+@api_bp.route('/books/<int:book_id>/progress')
+@api_login_required
+def book_progress(book_id):
+    fields = _requested_fields(PROGRESS_FIELDS)
+    stamp = _progress_stamps().filter(ReadingProgress.book_id == book_id).order_by(
+        ReadingProgress.id.desc()
+    ).first()
+    if stamp is None:
+        raise ApiError(404, 'No reading progress for this book')
+    return _conditional(_etag('progress', sorted(fields or ()), tuple(stamp)),
+                        lambda: _trim(db.session.get(ReadingProgress, stamp.id).to_dict(), fields))
+
+# Reviews
+
+def _review_stamps():
+    return db.session.query(Review.id, Review.updated_at, Review.rating).filter(Review.user_id == current_user.id)
+
+@api_bp.route('/reviews')
+@api_login_required
+def reviews():
+    fields = _requested_fields(REVIEW_FIELDS)
+    stamps, next_cursor = _page_stamps(_review_stamps(), Review.id)
+    return _list_response('reviews', stamps, next_cursor, fields,
+                          lambda ids: Review.query.filter(Review.id.in_(ids)), Review.to_dict)
+
+@api_bp.route('/books/<int:book_id>/review')
+@api_login_required
+def book_review(book_id):
+    fields = _requested_fields(REVIEW_FIELDS)
+    stamp = _review_stamps().filter(Review.book_id == book_id).first()
+    if stamp is None:
+        raise ApiError(404, 'You have not reviewed this book')
+    return _conditional(_etag('review', sorted(fields or ()), tuple(stamp)),
+                        lambda: _trim(db.session.get(Review, stamp.id).to_dict(), fields))
+
+# Challenges
+
+def _challenge_stamps():
+    # updated_at moves with every edit and every book added to or removed from the challenge
+    return db.session.query(Challenge.id, Challenge.updated_at).filter(Challenge.user_id == current_user.id)
+
+def _challenge_dict(challenge, book_ids=None):
+    data = challenge.to_dict()
+    if book_ids is not None:
+        data['book_ids'] = book_ids
+    return data
+
+@api_bp.route('/challenges')
+@api_login_required
+def challenges():
+    fields = _requested_fields([name for name in CHALLENGE_FIELDS if name != 'book_ids'])
+    stamps, next_cursor = _page_stamps(_challenge_stamps(), Challenge.id)
+    return _list_response('challenges', stamps, next_cursor, fields,
+                          lambda ids: Challenge.query.filter(Challenge.id.in_(ids)), _challenge_dict)
+
+@api_bp.route('/challenges/<int:challenge_id>')
+@api_login_required
+def challenge(challenge_id):
+    fields = _requested_fields(CHALLENGE_FIELDS)
+    stamp = _challenge_stamps().filter(Challenge.id == challenge_id).first()
+    if stamp is None:
+        raise ApiError(404, 'Challenge not found')
+    
+    def build():
+        book_ids = [book_id for (book_id,) in db.session.query(ChallengeBook.book_id).filter(
+            ChallengeBook.challenge_id == challenge_id
+        ).order_by(ChallengeBook.id)]
+        return _trim(_challenge_dict(db.session.get(Challenge, challenge_id), book_ids), fields)
+    return _conditional(_etag('challenge', sorted(fields or ()), tuple(stamp)), build)
+
+# Stats
+
+@api_bp.route('/stats')
+@api_login_required
+def stats():
+    """Reading totals and the books finished per month of ?year= (default: this year)"""
+    year = request.args.get('year', datetime.utcnow().year, type=int)
+    summary = get_user_stats(current_user.id)
+    months = {
+        row.month: (row.finished_count, row.pages_read)
+        for row in UserMonthlyStats.query.filter_by(user_id=current_user.id, year=year)
+    }
+    etag = _etag('stats', year, summary.updated_at, tuple(summary.to_dict().values()), sorted(months.items()))
+    
+    def build():
+        return {
+            'totals': summary.to_dict(),
+            'year': year,
+            'months': [
+                {'month': month, 'finished': months.get(month, (0, 0))[0], 'pages_read': months.get(month, (0, 0))[1]}
+                for month in range(1, 13)
+            ],
+            'updated_at': summary.updated_at.isoformat()
+        }
+    return _conditional(etag, build)
@@ -1,12 +1,21 @@
 from flask import Blueprint, render_template, url_for, flash, redirect, request
 from flask_login import login_user, current_user, logout_user, login_required
 from urllib.parse import urlparse
-from app import db, bcrypt
+from werkzeug.exceptions import ServiceUnavailable
+from app import db
 from app.models import User
+from app.services import PasswordHasherBusy, forget_session_user, remember_session_user
 from app.forms import RegistrationForm, LoginForm, UpdateAccountForm, ChangePasswordForm
 
 auth_bp = Blueprint('auth', __name__)
 
+@auth_bp.errorhandler(PasswordHasherBusy)
+def password_hasher_busy(exc):
+    # Back-pressure: have the client retry rather than queue more bcrypt work behind a full pool
+    return ServiceUnavailable(
+        'Too many sign-ins are being processed right now. Please try again in a moment.', retry_after=1
+    ).get_response()
+
 @auth_bp.route('/register', methods=['GET', 'POST'])
 def register():
     if current_user.is_authenticated:
@@ -35,6 +44,10 @@ def login():
         user = User.query.filter_by(email=form.email.data).first()
         
         if user and user.check_password(form.password.data):
+            if user.password_needs_rehash():
+                # BCRYPT_LOG_ROUNDS changed since this hash was made
+                user.set_password(form.password.data)
+                db.session.commit()
             login_user(user, remember=form.remember.data)
             next_page = request.args.get('next')
             flash('Login successful!', 'success')
@@ -50,6 +63,7 @@ def login():
 @auth_bp.route('/logout')
 def logout():
     logout_user()
+    forget_session_user()
     return redirect(url_for('main.home'))
 
 @auth_bp.route('/account', methods=['GET', 'POST'])
@@ -58,9 +72,12 @@ def account():
     form = UpdateAccountForm(current_user.username, current_user.email)
     
     if form.validate_on_submit():
-        current_user.username = form.username.data
-        current_user.email = form.email.data
+        user = db.session.get(User, current_user.id)
+        user.username = form.username.data
+        user.email = form.email.data
+        user.bump_session_version()
         db.session.commit()
+        remember_session_user(user)
         flash('Your account has been updated!', 'success')
         return redirect(url_for('auth.account'))
     elif request.method == 'GET':
@@ -76,9 +93,12 @@ def change_password():
     form = ChangePasswordForm()
     
     if form.validate_on_submit():
-        if current_user.check_password(form.current_password.data):
-            current_user.set_password(form.new_password.data)
+        user = db.session.get(User, current_user.id)
+        if user.check_password(form.current_password.data):
+            user.set_password(form.new_password.data)
+            user.bump_session_version()
             db.session.commit()
+            remember_session_user(user)
             flash('Your password has been updated!', 'success')
             return redirect(url_for('auth.account'))
         else:
@@ -1,94 +1,92 @@
-import os
-import requests
-from flask import Blueprint, render_template, url_for, flash, redirect, request, jsonify
+import json
+from datetime import date
+from flask import (
+    Blueprint, Response, render_template, url_for, flash, redirect, request, jsonify, current_app, stream_with_context
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import contains_eager, joinedload
 from flask_login import current_user, login_required
+from werkzeug.utils import secure_filename
 from app import db
-from app.models import Book, ReadingProgress, Review, ChallengeBook
-from app.forms import BookSearchForm, ManualBookAddForm, ReadingProgressForm, ReviewForm
-from fuzzywuzzy import fuzz
+from app.models import Book, Category, Challenge, LibraryImport, ReadingProgress, Review, Work
+from app.services import (
+    ENRICH_WORK_JOB, EXPORT_FORMATS, LibraryImportError, cover_url, create_import, enqueue, get_library_search,
+    SearchUnavailableError, get_rating_summaries, get_rating_summary, get_search_cache, iter_search_batches,
+    resume_import, search_books
+)
+from app.forms import BookSearchForm, LibraryImportForm, ManualBookAddForm, ReadingProgressForm, ReviewForm
 
 books_bp = Blueprint('books', __name__)
 
-def search_google_books(query):
-    """Search for books using Google Books API"""
-    api_key = os.environ.get('GOOGLE_BOOKS_API_KEY', '')
-    url = f"https://www.googleapis.com/books/v1/volumes?q={query}&key={api_key}&maxResults=40"
-    
-    try:
-        response = requests.get(url, timeout=10)
-        if response.status_code != 200:
-            return []
-    except requests.exceptions.RequestException:
-        return []
-    
-    data = response.json()
-    if 'items' not in data:
-        return []
-    
-    books = []
-    for item in data['items']:
-        volume_info = item.get('volumeInfo', {})
-        
-        # Extract book information
-        book = {
-            'id': item.get('id', ''),
-            'title': volume_info.get('title', 'Unknown Title'),
-            'authors': volume_info.get('authors', ['Unknown Author']),
-            'description': volume_info.get('description', ''),
-            'rating': volume_info.get('averageRating', 0),
-            'published_date': volume_info.get('publishedDate', ''),
-            'categories': volume_info.get('categories', []),
-            'page_count': volume_info.get('pageCount', 0),
-            'cover_image': None
-        }
-        
-        # Extract cover image if available
-        if 'imageLinks' in volume_info:
-            cover_url = volume_info['imageLinks'].get('thumbnail')
-            # Make sure the cover URL isn't too long
-            if cover_url and len(cover_url) > 1000:  # Set a reasonable limit for safety
-                # Try to use a smaller image if available
-                if 'smallThumbnail' in volume_info['imageLinks']:
-                    cover_url = volume_info['imageLinks'].get('smallThumbnail')
-            book['cover_image'] = cover_url
-            
-        # Calculate relevance score using fuzzy matching
-        title_score = fuzz.token_set_ratio(query.lower(), book['title'].lower())
-        
-        # If authors is a list, join them for matching
-        if isinstance(book['authors'], list):
-            authors_text = ', '.join(book['authors'])
-        else:
-            authors_text = book['authors']
-            
-        author_score = fuzz.token_set_ratio(query.lower(), authors_text.lower())
-        
-        # Consider description if available
-        description_score = 0
-        if book['description']:
-            description_score = fuzz.token_set_ratio(query.lower(), book['description'].lower()) * 0.3  # Lower weight for description
-        
-        # Calculate weighted relevance score
-        book['relevance_score'] = (title_score * 0.6) + (author_score * 0.3) + (description_score * 0.1)
-            
-        books.append(book)
-    
-    # Sort books by relevance score (highest first)
-    books.sort(key=lambda x: x['relevance_score'], reverse=True)
-    
-    return books
+def _result_covers(results):
+    """Proxied cover URLs for search results, from the works the search stored"""
+    if not results:
+        return {}
+    works = Work.query.filter(Work.google_books_id.in_([book['id'] for book in results]))
+    return {work.google_books_id: cover_url(work) for work in works}
 
 @books_bp.route('/search', methods=['GET', 'POST'])
 @login_required
 def search():
     form = BookSearchForm()
+    query = None
     results = []
+    stream_url = None
+    unavailable = None
     
     if form.validate_on_submit() or request.args.get('query'):
         query = form.query.data if form.validate_on_submit() else request.args.get('query')
-        results = search_google_books(query)
-    
-    return render_template('books/search.html', title='Search Books', form=form, results=results)
+        cached = get_search_cache().get(query)
+        if cached is not None:
+            results = cached
+        elif request.args.get('render'):
+            try:
+                results = search_books(query, check_cache=False)
+            except SearchUnavailableError as exc:
+                unavailable = str(exc)
+        else:
+            # main.js loads the results progressively from the streaming endpoint, which needn't look up the miss again
+            stream_url = url_for('books.search_results', query=query, cached=0)
+    
+    return render_template('books/search.html',
+                          title='Search Books',
+                          form=form,
+                          query=query,
+                          results=results,
+                          covers=_result_covers(results),
+                          stream_url=stream_url,
+                          unavailable=unavailable)
+
+@books_bp.route('/search/results')
+@login_required
+def search_results():
+    """Stream search results as newline-delimited JSON, one ranked batch per Google Books page"""
+    query = request.args.get('query', '').strip()
+    if not query:
+        return jsonify({'error': 'Missing query'}), 400
+    check_cache = request.args.get('cached') != '0'
+    
+    def generate():
+        count = 0
+        try:
+            for batch in iter_search_batches(query, check_cache):
+                covers = _result_covers(batch)
+                results = []
+                for book in batch:
+                    cover = covers.get(book['id'], book['cover_image'])
+                    results.append(dict(
+                        book, cover_url=cover,
+                        html=render_template('books/_search_result.html', book=book, cover=cover, top_match=False)
+                    ))
+                count += len(results)
+                yield json.dumps({'results': results}) + '\n'
+        except SearchUnavailableError as exc:
+            yield json.dumps({'error': str(exc)}) + '\n'
+            return
+        yield json.dumps({'done': True, 'count': count}) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-store', 'X-Accel-Buffering': 'no'})
 
 @books_bp.route('/add_manual', methods=['GET', 'POST'])
 @login_required
@@ -96,19 +94,20 @@ def add_manual():
     form = ManualBookAddForm()
     
     if form.validate_on_submit():
-        book = Book(
+        # Manually entered metadata gets a catalog work of its own
+        work = Work(
             title=form.title.data,
             authors=form.authors.data,
-            description=form.description.data,
             published_date=form.published_date.data,
-            categories=form.categories.data,
             page_count=form.page_count.data,
             avg_rating=form.avg_rating.data,
-            cover_image=form.cover_image.data,
-            user_id=current_user.id
+            cover_image=form.cover_image.data
         )
-        
+        work.set_description(form.description.data)
+        book = Book(work=work, user_id=current_user.id)
+        # Added first: looking up the categories autoflushes
         db.session.add(book)
+        book.set_categories(form.categories.data)
         db.session.commit()
         
         # Add reading progress record
@@ -130,51 +129,35 @@ def add_manual():
 @login_required
 def add_from_api(google_id):
     # Check if book already exists
-    existing_book = Book.query.filter_by(google_books_id=google_id, user_id=current_user.id).first()
+    existing_book = Book.query.join(Book.work).options(contains_eager(Book.work)).filter(
+        Work.google_books_id == google_id,
+        Book.user_id == current_user.id
+    ).first()
     if existing_book:
         flash('This book is already in your library!', 'info')
         return redirect(url_for('books.view', book_id=existing_book.id))
     
-    # Get book details from API
-    api_key = os.environ.get('GOOGLE_BOOKS_API_KEY', '')
-    url = f"https://www.googleapis.com/books/v1/volumes/{google_id}?key={api_key}"
-    
-    try:
-        response = requests.get(url, timeout=10)
-        if response.status_code != 200:
-            flash('Error fetching book details.', 'danger')
-            return redirect(url_for('books.search'))
-    except requests.exceptions.RequestException:
-        flash('Network error while fetching book details. Please try again.', 'danger')
-        return redirect(url_for('books.search'))
-    
-    data = response.json()
-    volume_info = data.get('volumeInfo', {})
-    
-    # Create book object
-    book = Book(
-        title=volume_info.get('title', 'Unknown Title'),
-        authors=', '.join(volume_info.get('authors', ['Unknown Author'])),
-        description=volume_info.get('description', ''),
-        avg_rating=volume_info.get('averageRating', 0),
-        published_date=volume_info.get('publishedDate', ''),
-        categories=', '.join(volume_info.get('categories', [])) if 'categories' in volume_info else '',
-        page_count=volume_info.get('pageCount', 0),
-        google_books_id=google_id,
-        user_id=current_user.id
-    )
-    
-    # Get cover image if available
-    if 'imageLinks' in volume_info:
-        cover_url = volume_info['imageLinks'].get('thumbnail')
-        # Make sure the cover URL isn't too long
-        if cover_url and len(cover_url) > 1000:  # Set a reasonable limit for safety
-            # Try to use a smaller image if available
-            if 'smallThumbnail' in volume_info['imageLinks']:
-                cover_url = volume_info['imageLinks'].get('smallThumbnail')
-        book.cover_image = cover_url
-    
+    # Use the shared catalog work (stored by the search that listed it), or record a placeholder
+    work = Work.query.filter_by(google_books_id=google_id).first()
+    if work is None:
+        try:
+            with db.session.begin_nested():
+                work = Work(google_books_id=google_id, title='Unknown Title', authors='Unknown Author')
+                db.session.add(work)
+        except IntegrityError:
+            # Another request recorded it first
+            work = Work.query.filter_by(google_books_id=google_id).one()
+    
+    # Missing or stale details are fetched in the background instead of blocking this request
+    if work.is_stale(current_app.config['VOLUME_CACHE_MAX_AGE']):
+        enqueue(ENRICH_WORK_JOB, google_id)
+    
+    # Create the library entry; the description is sanitized once for every user of the work
+    work.refresh_description()
+    book = Book(work=work, user_id=current_user.id)
+    # Added first: looking up the categories autoflushes
     db.session.add(book)
+    book.set_categories(work.categories)
     db.session.commit()
     
     # Add reading progress record
@@ -187,7 +170,10 @@ def add_from_api(google_id):
     db.session.add(progress)
     db.session.commit()
     
-    flash('Book added to your library!', 'success')
+    if work.is_placeholder:
+        flash('Book added to your library! Its details are being fetched from Google Books.', 'success')
+    else:
+        flash('Book added to your library!', 'success')
     return redirect(url_for('books.view', book_id=book.id))
 
 @books_bp.route('/library')
@@ -197,53 +183,143 @@ def library():
     status_filter = request.args.get('status', 'all')
     category_filter = request.args.get('category', 'all')
     rating_filter = request.args.get('rating', 'all')
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', current_app.config['LIBRARY_PAGE_SIZE'], type=int)
     
-    # Base query - get reading progress entries for current user
-    query = ReadingProgress.query.filter_by(user_id=current_user.id)
+    # Base query - reading progress joined to its book and work in a single round trip
+    query = ReadingProgress.query.join(ReadingProgress.book).join(Book.work).options(
+        contains_eager(ReadingProgress.book).contains_eager(Book.work)
+    ).filter(ReadingProgress.user_id == current_user.id)
     
     # Apply status filter
     if status_filter != 'all':
-        query = query.filter_by(status=status_filter)
-    
-    # Get progress entries
-    reading_entries = query.all()
+        query = query.filter(ReadingProgress.status == status_filter)
+    
+    # Apply category filter against the normalized category index
+    if category_filter != 'all':
+        query = query.filter(Book.category_list.any(
+            (Category.user_id == current_user.id) & (Category.name == category_filter)
+        ))
+    
+    # Apply rating filter
+    if rating_filter != 'all' and rating_filter.isdigit():
+        query = query.filter(Work.avg_rating >= int(rating_filter))
+    
+    query = query.order_by(ReadingProgress.last_updated.desc(), ReadingProgress.id.desc())
+    pagination = query.paginate(
+        page=page,
+        per_page=per_page,
+        max_per_page=current_app.config['LIBRARY_MAX_PAGE_SIZE'],
+        error_out=False
+    )
     
-    # Collect books and related data
-    library_data = []
-    for entry in reading_entries:
-        book = Book.query.get(entry.book_id)
-        
-        # Apply category filter
-        if category_filter != 'all' and (not book.categories or category_filter not in book.categories):
-            continue
-            
-        # Apply rating filter
-        if rating_filter != 'all':
-            min_rating = int(rating_filter)
-            if book.avg_rating < min_rating:
-                continue
-        
-        library_data.append({
-            'book': book,
-            'progress': entry
-        })
+    # Reader ratings for the whole page in one query
+    ratings = get_rating_summaries(entry.book_id for entry in pagination.items)
+    library_data = [
+        {'book': entry.book, 'progress': entry, 'ratings': ratings[entry.book_id]}
+        for entry in pagination.items
+    ]
     
     # Get available categories for filter dropdown
-    all_books = Book.query.filter_by(user_id=current_user.id).all()
-    categories = set()
-    for book in all_books:
-        if book.categories:
-            for category in book.categories.split(','):
-                categories.add(category.strip())
+    categories = Category.names_for_user(current_user.id)
     
     return render_template('books/library.html', 
                           title='My Library', 
                           library_data=library_data,
-                          categories=sorted(list(categories)),
+                          pagination=pagination,
+                          categories=categories,
                           status_filter=status_filter,
                           category_filter=category_filter,
                           rating_filter=rating_filter)
 
+@books_bp.route('/library/import', methods=['GET', 'POST'])
+@login_required
+def import_library():
+    form = LibraryImportForm()
+    
+    if form.validate_on_submit():
+        upload = form.file.data
+        try:
+            # Saved to disk and imported in the background, so large exports don't hold up the request
+            filename = secure_filename(upload.filename) or 'library.csv'
+            library_import = create_import(current_user.id, filename, upload.stream)
+        except LibraryImportError as exc:
+            flash(str(exc), 'danger')
+        else:
+            flash(f'Importing {library_import.total_rows} books from {library_import.filename}.', 'success')
+            return redirect(url_for('books.import_library'))
+    
+    imports = LibraryImport.query.filter_by(user_id=current_user.id).order_by(
+        LibraryImport.created_at.desc()
+    ).limit(10).all()
+    return render_template('books/import.html', title='Import Library', form=form, imports=imports)
+
+@books_bp.route('/library/import/<int:import_id>')
+@login_required
+def import_status(import_id):
+    library_import = LibraryImport.query.filter_by(id=import_id, user_id=current_user.id).first_or_404()
+    return jsonify(library_import.to_dict())
+
+@books_bp.route('/library/import/<int:import_id>/resume', methods=['POST'])
+@login_required
+def import_resume(import_id):
+    library_import = LibraryImport.query.filter_by(id=import_id, user_id=current_user.id).first_or_404()
+    if library_import.status == 'done':
+        flash('This import has already finished.', 'info')
+    else:
+        resume_import(library_import)
+        flash(f'Resuming the import of {library_import.filename}.', 'success')
+    return redirect(url_for('books.import_library'))
+
+@books_bp.route('/library/export')
+@login_required
+def export_library():
+    """Stream the library as CSV or JSON Lines (?format=ndjson), reading entries in batches"""
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unknown export format {export_format!r}'}), 400
+    generate, mimetype, extension = EXPORT_FORMATS[export_format]
+    
+    filename = f'library-{date.today().isoformat()}.{extension}'
+    return Response(stream_with_context(generate(current_user.id)), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'Cache-Control': 'no-store',
+        'X-Accel-Buffering': 'no'
+    })
+
+@books_bp.route('/library/search')
+@login_required
+def library_search():
+    query = request.args.get('q', '').strip()
+    index = get_library_search()
+    results = []
+    
+    if query and index is not None:
+        # Ranked book ids from the full-text index, then one joined query for the rows
+        hits = index.search(current_user.id, query, limit=current_app.config['LIBRARY_SEARCH_LIMIT'])
+        entries = ReadingProgress.query.join(ReadingProgress.book).options(
+            contains_eager(ReadingProgress.book)
+        ).filter(
+            ReadingProgress.user_id == current_user.id,
+            ReadingProgress.book_id.in_([book_id for book_id, score in hits])
+        ).all() if hits else []
+        
+        entries_by_book = {entry.book_id: entry for entry in entries}
+        for book_id, score in hits:
+            entry = entries_by_book.get(book_id)
+            if entry:
+                results.append({
+                    'book': entry.book,
+                    'progress': entry,
+                    'score': score
+                })
+    
+    return render_template('books/library_search.html',
+                          title='Search My Library',
+                          query=query,
+                          results=results,
+                          search_available=index is not None)
+
 @books_bp.route('/book/<int:book_id>', methods=['GET', 'POST'])
 @login_required
 def view(book_id):
@@ -264,6 +340,10 @@ def view(book_id):
         progress_form.status.data = progress.status
         progress_form.progress.data = progress.progress
         progress_form.progress_type.data = progress.progress_type
+        
+        # Re-sanitize once after a sanitizer config change instead of on every view
+        if book.work.refresh_description():
+            db.session.commit()
     
     # Review form
     review = Review.query.filter_by(book_id=book_id, user_id=current_user.id).first()
@@ -289,11 +369,12 @@ def view(book_id):
         review_form.rating.data = review.rating
         review_form.review_text.data = review.review_text
     
-    # Get other reviews
-    other_reviews = Review.query.filter(
-        Review.book_id == book_id,
+    # Get other readers' reviews of the same work
+    other_reviews = Review.query.join(Review.book).options(joinedload(Review.reviewer)).filter(
+        Book.work_id == book.work_id,
         Review.user_id != current_user.id
-    ).all()
+    ).order_by(Review.updated_at.desc()).all()
+    rating_summary = get_rating_summary(book_id)
     
     return render_template('books/view.html',
                           title=book.title,
@@ -302,19 +383,25 @@ def view(book_id):
                           progress_form=progress_form,
                           review=review,
                           review_form=review_form,
-                          other_reviews=other_reviews)
+                          other_reviews=other_reviews,
+                          rating_summary=rating_summary)
 
 @books_bp.route('/book/<int:book_id>/delete', methods=['POST'])
 @login_required
 def delete(book_id):
     book = Book.query.filter_by(id=book_id, user_id=current_user.id).first_or_404()
     
-    # Delete associated records
-    ReadingProgress.query.filter_by(book_id=book_id).delete()
-    Review.query.filter_by(book_id=book_id).delete()
-    ChallengeBook.query.filter_by(book_id=book_id).delete()
+    # Delete associated records (through the ORM so stats and rating summaries stay in sync)
+    for entry in ReadingProgress.query.filter_by(book_id=book_id):
+        db.session.delete(entry)
+    for review in Review.query.filter_by(book_id=book_id):
+        db.session.delete(review)
+    Challenge.remove_book_from_all(book_id)
     
     db.session.delete(book)
+    # A manually added book's work belongs to this entry alone
+    if book.work.google_books_id is None:
+        db.session.delete(book.work)
     db.session.commit()
     
     flash('Book has been deleted from your library.', 'success')
@@ -1,6 +1,7 @@
-from flask import Blueprint, render_template, url_for, flash, redirect, request
+from flask import Blueprint, render_template, url_for, flash, redirect, request, current_app
 from flask_login import current_user, login_required
 from datetime import datetime
+from sqlalchemy.orm import contains_eager
 from app import db
 from app.models import Challenge, ChallengeBook, Book, ReadingProgress
 from app.forms import CreateChallengeForm, UpdateChallengeForm
@@ -10,35 +11,28 @@ challenges_bp = Blueprint('challenges', __name__)
 @challenges_bp.route('/challenges')
 @login_required
 def list_challenges():
-    # Get active and completed challenges
-    active_challenges = Challenge.query.filter_by(
-        user_id=current_user.id,
-        completed=False
-    ).order_by(Challenge.end_date.asc()).all()
-    
-    completed_challenges = Challenge.query.filter_by(
-        user_id=current_user.id,
-        completed=True
-    ).order_by(Challenge.end_date.desc()).all()
-    
-    # Calculate progress for each challenge
-    challenges_data = []
-    for challenge in active_challenges:
-        progress = challenge.get_progress()
-        days_left = (challenge.end_date - datetime.utcnow()).days
-        challenges_data.append({
-            'challenge': challenge,
-            'progress': progress,
-            'days_left': max(0, days_left)
-        })
+    # Get active and completed challenges in one query; progress comes from the maintained counter
+    challenges = Challenge.query.filter_by(user_id=current_user.id).order_by(Challenge.end_date.asc()).all()
     
+    challenges_data = []
     completed_data = []
-    for challenge in completed_challenges:
+    for challenge in challenges:
         progress = challenge.get_progress()
-        completed_data.append({
-            'challenge': challenge,
-            'progress': progress
-        })
+        if challenge.completed:
+            completed_data.append({
+                'challenge': challenge,
+                'progress': progress
+            })
+        else:
+            days_left = (challenge.end_date - datetime.utcnow()).days
+            challenges_data.append({
+                'challenge': challenge,
+                'progress': progress,
+                'days_left': max(0, days_left)
+            })
+    
+    # Completed challenges are listed most recent first
+    completed_data.reverse()
     
     return render_template('challenges/list.html',
                           title='Reading Challenges',
@@ -80,33 +74,32 @@ def view(challenge_id):
     
     time_progress = min(100, int((days_passed / days_total) * 100))
     
-    # Get completed books for this challenge
-    completed_books = []
-    for challenge_book in challenge.completed_books:
-        book = Book.query.get(challenge_book.book_id)
-        if book:
-            completed_books.append({
-                'book': book,
-                'date_added': challenge_book.date_added
-            })
-    
-    # Sort books by date added to challenge
-    completed_books.sort(key=lambda x: x['date_added'], reverse=True)
-    
-    # Get candidate books (finished books not in challenge)
-    finished_entries = ReadingProgress.query.filter_by(
-        user_id=current_user.id,
-        status='finished'
-    ).all()
-    
-    candidate_books = []
-    challenge_book_ids = [cb.book_id for cb in challenge.completed_books]
-    
-    for entry in finished_entries:
-        if entry.book_id not in challenge_book_ids:
-            book = Book.query.get(entry.book_id)
-            if book:
-                candidate_books.append(book)
+    # Get completed books for this challenge, newest first, with their books in the same query
+    challenge_books = ChallengeBook.query.join(ChallengeBook.book).options(
+        contains_eager(ChallengeBook.book)
+    ).filter(
+        ChallengeBook.challenge_id == challenge.id
+    ).order_by(ChallengeBook.date_added.desc()).all()
+    
+    completed_books = [
+        {'book': challenge_book.book, 'date_added': challenge_book.date_added}
+        for challenge_book in challenge_books
+    ]
+    
+    # Get candidate books (finished books not in challenge) with an anti-join
+    in_challenge = db.session.query(ChallengeBook.id).filter(
+        ChallengeBook.challenge_id == challenge.id,
+        ChallengeBook.book_id == Book.id
+    ).exists()
+    candidates = Book.query.join(ReadingProgress, ReadingProgress.book_id == Book.id).filter(
+        ReadingProgress.user_id == current_user.id,
+        ReadingProgress.status == 'finished',
+        ~in_challenge
+    ).order_by(ReadingProgress.end_date.desc(), Book.id.desc()).paginate(
+        page=request.args.get('page', 1, type=int),
+        per_page=current_app.config['CHALLENGE_CANDIDATES_PAGE_SIZE'],
+        error_out=False
+    )
     
     return render_template('challenges/view.html',
                           title=f'Challenge: {challenge.title}',
@@ -115,7 +108,8 @@ def view(challenge_id):
                           days_left=max(0, days_left),
                           time_progress=time_progress,
                           completed_books=completed_books,
-                          candidate_books=candidate_books)
+                          candidate_books=candidates.items,
+                          candidates=candidates)
 
 @challenges_bp.route('/challenges/<int:challenge_id>/edit', methods=['GET', 'POST'])
 @login_required
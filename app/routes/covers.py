@@ -0,0 +1,69 @@
+import os
+from flask import Blueprint, Response, abort, current_app, redirect, request, send_file
+from app import db
+from app.models import Work
+from app.services import COVER_SIZES, CoverError, cover_version, get_cover_cache
+
+covers_bp = Blueprint('covers', __name__)
+
+# Cache lifetime for cover URLs without the current ?v= fingerprint
+UNVERSIONED_MAX_AGE = 3600
+
+def _serve(path, etag, max_age, immutable):
+    """Send a cached thumbnail, handing the file to the front-end server when configured"""
+    accel_prefix = current_app.config['COVER_ACCEL_REDIRECT_PREFIX']
+    if accel_prefix:
+        # nginx serves the file itself from an internal location mapped onto COVER_CACHE_DIR
+        relative = os.path.relpath(path, get_cover_cache().directory).replace(os.sep, '/')
+        response = Response(mimetype='image/jpeg', headers={'X-Accel-Redirect': f"{accel_prefix.rstrip('/')}/{relative}"})
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+        response = response.make_conditional(request)
+        if response.status_code == 304:
+            response.headers.pop('X-Accel-Redirect', None)
+    else:
+        # Honours USE_X_SENDFILE for Apache/lighttpd
+        response = send_file(path, mimetype='image/jpeg', etag=etag, max_age=max_age, conditional=True)
+    if immutable:
+        response.cache_control.immutable = True
+    return response
+
+@covers_bp.route('/covers/<int:work_id>', defaults={'size': 'thumb'})
+@covers_bp.route('/covers/<int:work_id>/<size>')
+def cover(work_id, size):
+    """Serve a work's cover as a fixed-size thumbnail, fetching the original once"""
+    if size not in COVER_SIZES:
+        abort(404)
+    work = db.session.get(Work, work_id)
+    if work is None or not work.cover_image:
+        abort(404)
+    
+    cache = get_cover_cache()
+    # Other covers are linked directly by cover_url(); redirecting to them would make this an open redirect
+    if not cache.can_proxy(work.cover_image):
+        abort(404)
+    
+    # A URL carrying the current cover fingerprint never changes content
+    immutable = request.args.get('v') == cover_version(work.cover_image)
+    max_age = current_app.config['COVER_MAX_AGE'] if immutable else UNVERSIONED_MAX_AGE
+    
+    # Revalidation needs no disk access once the cover is known
+    if work.cover_digest and cache.etag(work.cover_digest, size) in request.if_none_match:
+        response = Response(status=304)
+        response.set_etag(cache.etag(work.cover_digest, size))
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+        return response
+    
+    try:
+        if work.cover_digest is None or not os.path.exists(cache.original_path(work.cover_digest)):
+            work.cover_digest = cache.fetch(work.cover_image)
+            db.session.commit()
+        path = cache.thumbnail(work.cover_digest, size)
+    except CoverError as exc:
+        # Let the browser try the remote image instead (only ever on an allowed host)
+        current_app.logger.warning('Cover for work %s unavailable: %s', work_id, exc)
+        return redirect(work.cover_image)
+    
+    return _serve(path, cache.etag(work.cover_digest, size), max_age, immutable)
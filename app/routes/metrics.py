@@ -0,0 +1,22 @@
+import hmac
+from flask import Blueprint, Response, abort, current_app, request
+from app.services import get_query_profiler, get_search_cache, render_search_cache_metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+def _authorized():
+    token = current_app.config['METRICS_TOKEN']
+    supplied = request.headers.get('Authorization', '')
+    return hmac.compare_digest(supplied.encode(), f'Bearer {token}'.encode())
+
+@metrics_bp.route('/_metrics')
+def metrics():
+    """Prometheus scrape endpoint, hidden unless the profiler is on and a token is configured"""
+    profiler = get_query_profiler()
+    if profiler is None or not current_app.config['METRICS_TOKEN']:
+        abort(404)
+    if not _authorized():
+        return Response('Unauthorized\n', status=401, headers={'WWW-Authenticate': 'Bearer'})
+    
+    body = profiler.render() + render_search_cache_metrics(get_search_cache().stats())
+    return Response(body, mimetype='text/plain; version=0.0.4')
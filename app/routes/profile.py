@@ -1,10 +1,14 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, request
 from flask_login import current_user, login_required
 from datetime import datetime
-from app.models import ReadingProgress, Book, Review, Challenge
+from app.models import Book, Review, Challenge
+from app.services import get_monthly_finished, get_recently_finished
 
 profile_bp = Blueprint('profile', __name__)
 
+# Longest year range shown on the monthly activity chart
+MAX_STATS_YEARS = 10
+
 @profile_bp.route('/profile/stats')
 @login_required
 def stats():
@@ -12,42 +16,16 @@ def stats():
     stats = current_user.get_reading_stats()
     
     # Get recently read books
-    finished_entries = ReadingProgress.query.filter_by(
-        user_id=current_user.id,
-        status='finished'
-    ).order_by(ReadingProgress.end_date.desc()).limit(5).all()
-    
-    recent_books = []
-    for entry in finished_entries:
-        book = Book.query.get(entry.book_id)
-        if book:
-            recent_books.append({
-                'book': book,
-                'date_finished': entry.end_date
-            })
+    recent_books = get_recently_finished(current_user.id, limit=5)
     
-    # Get reading activity (books finished per month)
-    year = datetime.now().year
-    monthly_stats = []
-    
-    for month in range(1, 13):
-        start_date = datetime(year, month, 1)
-        if month == 12:
-            end_date = datetime(year + 1, 1, 1)
-        else:
-            end_date = datetime(year, month + 1, 1)
-        
-        count = ReadingProgress.query.filter(
-            ReadingProgress.user_id == current_user.id,
-            ReadingProgress.status == 'finished',
-            ReadingProgress.end_date >= start_date,
-            ReadingProgress.end_date < end_date
-        ).count()
-        
-        monthly_stats.append({
-            'month': start_date.strftime('%b'),
-            'count': count
-        })
+    # Get reading activity (books finished per month) for the requested years
+    year = request.args.get('year', datetime.now().year, type=int)
+    start_year = request.args.get('start_year', year, type=int)
+    end_year = request.args.get('end_year', start_year, type=int)
+    start_year, end_year = sorted((min(max(start_year, 1), 9998), min(max(end_year, 1), 9998)))
+    # Keep the chart readable
+    start_year = max(start_year, end_year - MAX_STATS_YEARS + 1)
+    monthly_stats = get_monthly_finished(current_user.id, start_year, end_year)
     
     # Get top rated books
     top_rated = Book.query.join(Review, Book.id == Review.book_id).filter(
@@ -76,5 +54,7 @@ def stats():
                           stats=stats,
                           recent_books=recent_books,
                           monthly_stats=monthly_stats,
+                          start_year=start_year,
+                          end_year=end_year,
                           top_rated=top_rated,
                           challenges_data=challenges_data) 
\ No newline at end of file
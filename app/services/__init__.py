@@ -0,0 +1,28 @@
+from app.services.book_search import SearchUnavailableError, iter_search_batches, search_books, search_result
+from app.services.covers import (
+    COVER_SIZES, CoverCache, CoverError, cover_url, cover_version, get_cover_cache, init_cover_cache
+)
+from app.services.google_books import CircuitOpenError, GoogleBooksClient, get_google_books_client, init_google_books
+from app.services.jobs import JobQueue, enqueue, get_job_queue, init_job_queue, job_handler
+from app.services.library_search import get_library_search, init_library_search
+from app.services.profiler import QueryProfiler, get_query_profiler, init_query_profiler, render_search_cache_metrics
+from app.services.ranking import rank_books
+from app.services.search_cache import SearchCache, get_search_cache, init_search_cache, normalize_query
+from app.services.volumes import ENRICH_WORK_JOB, enrich_work, fetch_volume, store_volumes
+from app.services.stats import (
+    get_monthly_finished, get_reading_stats, get_recently_finished, get_user_stats,
+    rebuild_user_stats, verify_user_stats
+)
+from app.services.ratings import get_rating_summaries, get_rating_summary, rebuild_rating_summaries
+from app.services.importer import (
+    IMPORT_JOB, LibraryImportError, count_rows, create_import, parse_goodreads_row, resume_import, run_import
+)
+from app.services.exporter import EXPORT_FIELDS, EXPORT_FORMATS, export_csv, export_ndjson, iter_library_export
+from app.services.user_cache import (
+    SessionUser, cache_user, forget_session_user, get_user_cache, init_user_cache, load_session_user,
+    remember_session_user
+)
+from app.services.passwords import (
+    PasswordHasher, PasswordHasherBusy, get_password_hasher, hash_cost, init_password_hasher
+)
+from app.services.api_tokens import issue_api_token, load_request_token_user, load_token_user
@@ -0,0 +1,45 @@
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from app import db
+from app.models import User
+from app.services.user_cache import cache_user, get_user_cache
+
+# Keeps API tokens from being accepted as any other value signed with SECRET_KEY
+TOKEN_SALT = 'api-token'
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=TOKEN_SALT)
+
+def issue_api_token(user):
+    """Signed bearer token for the JSON API; account and password changes bump session_version, revoking it"""
+    return _serializer().dumps({'id': user.id, 'version': user.session_version})
+
+def load_token_user(token):
+    """Identity a bearer token was issued to, or None when it is invalid, expired or revoked.
+    
+    Like session identities, it comes from the user cache, so a revocation reaches other workers within
+    USER_CACHE_TTL seconds.
+    """
+    try:
+        claims = _serializer().loads(token, max_age=current_app.config['API_TOKEN_MAX_AGE'])
+    except BadSignature:
+        return None
+    
+    identity = get_user_cache().get(claims['id'])
+    if identity is None or identity.session_version < claims['version']:
+        user = db.session.get(User, claims['id'])
+        if user is None:
+            return None
+        identity = cache_user(user)
+    if identity.session_version != claims['version']:
+        return None
+    return identity
+
+def load_request_token_user(request):
+    """Identity for Flask-Login's request_loader: a bearer token, only honoured on API requests"""
+    if request.blueprint != 'api':
+        return None
+    authorization = request.authorization
+    if authorization is None or authorization.type != 'bearer' or not authorization.token:
+        return None
+    return load_token_user(authorization.token)
@@ -0,0 +1,84 @@
+from flask import current_app
+from app.models import get_cover_url
+from app.services.google_books import get_google_books_client
+from app.services.ranking import rank_books
+from app.services.search_cache import get_search_cache
+from app.services.volumes import store_volumes
+
+# Google Books returns at most 40 results per request
+SEARCH_PAGE_SIZE = 40
+
+class SearchUnavailableError(Exception):
+    """Raised when none of a search's result pages could be fetched"""
+
+def search_result(item):
+    """Shape a Google Books volume resource as a search result"""
+    volume_info = item.get('volumeInfo', {})
+    return {
+        'id': item.get('id', ''),
+        'title': volume_info.get('title', 'Unknown Title'),
+        'authors': volume_info.get('authors', ['Unknown Author']),
+        'description': volume_info.get('description', ''),
+        'rating': volume_info.get('averageRating', 0),
+        'published_date': volume_info.get('publishedDate', ''),
+        'categories': volume_info.get('categories', []),
+        'page_count': volume_info.get('pageCount', 0),
+        'cover_image': get_cover_url(volume_info)
+    }
+
+def iter_search_batches(query, check_cache=True):
+    """Yield ranked batches of new results as Google Books result pages arrive.
+    
+    Pages are fetched concurrently and deduplicated by volume id. Relevance
+    scores don't depend on the other results, so each batch can be ranked on
+    its own and merged by score. A cached search is yielded as one batch; a
+    search is only cached once every page has been fetched. Callers that have
+    just missed the cache themselves pass check_cache=False.
+    
+    Raises SearchUnavailableError, before yielding anything, when every page
+    request fails.
+    """
+    cache = get_search_cache()
+    if check_cache:
+        cached = cache.get(query)
+        if cached is not None:
+            if cached:
+                yield cached
+            return
+    
+    seen = set()
+    merged = []
+    complete = True
+    fetched = False
+    pages = current_app.config['GOOGLE_BOOKS_SEARCH_PAGES']
+    for start_index, data in get_google_books_client().search_pages(query, pages, SEARCH_PAGE_SIZE):
+        if data is None:
+            complete = False
+            continue
+        fetched = True
+        
+        items = []
+        for item in data.get('items', []):
+            if item.get('id') and item['id'] not in seen:
+                seen.add(item['id'])
+                items.append(item)
+        if not items:
+            continue
+        
+        # Remember volume metadata so adding a result doesn't need another API call
+        store_volumes(items)
+        batch = rank_books(query, [search_result(item) for item in items])
+        merged.extend(batch)
+        yield batch
+    
+    if not fetched:
+        raise SearchUnavailableError('The book service is unavailable. Please try again in a moment.')
+    if complete:
+        merged.sort(key=lambda book: book['relevance_score'], reverse=True)
+        cache.set(query, merged)
+
+def search_books(query, check_cache=True):
+    """Search Google Books, returning every page's results merged and sorted by relevance"""
+    results = [book for batch in iter_search_batches(query, check_cache) for book in batch]
+    results.sort(key=lambda book: book['relevance_score'], reverse=True)
+    return results
@@ -0,0 +1,133 @@
+import hashlib
+import io
+import os
+import tempfile
+from urllib.parse import urlsplit
+import requests
+from flask import current_app, url_for
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Thumbnail sizes (width, height) served by /covers/<work_id>/<size>
+COVER_SIZES = {
+    'small': (96, 144),
+    'thumb': (200, 300),
+    'large': (400, 600),
+}
+
+# Bump when thumbnail generation changes so cached files and ETags are replaced
+THUMBNAIL_VERSION = 1
+
+class CoverError(Exception):
+    """Raised when a cover can't be fetched or isn't a usable image"""
+
+def cover_version(cover_image):
+    """Short fingerprint of a cover URL, used to version the proxy URL"""
+    return hashlib.sha1(cover_image.encode()).hexdigest()[:12]
+
+class CoverCache:
+    """Content-addressed on-disk cache of remote cover images and their thumbnails"""
+    
+    def __init__(self, directory, allowed_hosts, timeout=(3.05, 10), max_bytes=5 * 1024 * 1024, quality=85):
+        self.directory = directory
+        self.allowed_hosts = {host.lower() for host in allowed_hosts}
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.quality = quality
+        self.session = requests.Session()
+    
+    def can_proxy(self, url):
+        """Only covers on the configured hosts are fetched server-side"""
+        parts = urlsplit(url or '')
+        return parts.scheme in ('http', 'https') and (parts.hostname or '').lower() in self.allowed_hosts
+    
+    def _path(self, kind, name):
+        return os.path.join(self.directory, kind, name[:2], name)
+    
+    def original_path(self, digest):
+        return self._path('originals', digest)
+    
+    def thumbnail_path(self, digest, size):
+        return self._path(f'thumbs-v{THUMBNAIL_VERSION}-{size}', f'{digest}.jpg')
+    
+    def _write(self, path, data):
+        # Write to a temporary file and rename, so readers never see a partial image
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(handle, 'wb') as temp:
+                temp.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+    
+    def fetch(self, url):
+        """Download a cover into the cache, returning the sha256 digest of its bytes"""
+        if not self.can_proxy(url):
+            raise CoverError(f'Covers from {urlsplit(url).hostname} are not proxied')
+        
+        try:
+            # No redirects: they could lead off the allowed hosts
+            with self.session.get(url, timeout=self.timeout, stream=True, allow_redirects=False) as response:
+                if response.status_code != 200:
+                    raise CoverError(f'Cover request returned HTTP {response.status_code}')
+                data = bytearray()
+                for chunk in response.iter_content(64 * 1024):
+                    data.extend(chunk)
+                    if len(data) > self.max_bytes:
+                        raise CoverError('Cover image is too large')
+        except requests.exceptions.RequestException as exc:
+            raise CoverError(f'Cover request failed: {exc}') from exc
+        
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.original_path(digest)
+        if not os.path.exists(path):
+            self._write(path, bytes(data))
+        return digest
+    
+    def thumbnail(self, digest, size):
+        """Return the path of a cached fixed-size JPEG thumbnail, generating it on first use"""
+        path = self.thumbnail_path(digest, size)
+        if os.path.exists(path):
+            return path
+        
+        try:
+            with Image.open(self.original_path(digest)) as image:
+                image = ImageOps.exif_transpose(image).convert('RGB')
+                thumbnail = ImageOps.fit(image, COVER_SIZES[size], Image.LANCZOS)
+        except (OSError, UnidentifiedImageError) as exc:
+            raise CoverError(f'Cover {digest} is not a readable image') from exc
+        except Image.DecompressionBombError as exc:
+            raise CoverError(f'Cover {digest} has too many pixels to decode') from exc
+        
+        output = io.BytesIO()
+        thumbnail.save(output, 'JPEG', quality=self.quality, optimize=True, progressive=True)
+        self._write(path, output.getvalue())
+        return path
+    
+    def etag(self, digest, size):
+        """Strong ETag: thumbnails are a pure function of the original bytes, size and THUMBNAIL_VERSION"""
+        return f'{digest[:32]}-{size}-v{THUMBNAIL_VERSION}'
+
+def cover_url(work, size='thumb'):
+    """URL for a work's cover: the local proxy for allowed hosts, otherwise the remote URL itself"""
+    if work is None or not work.cover_image:
+        return None
+    if not get_cover_cache().can_proxy(work.cover_image):
+        return work.cover_image
+    return url_for('covers.cover', work_id=work.id, size=size, v=cover_version(work.cover_image))
+
+def init_cover_cache(app):
+    """Create the cover cache for this app and expose cover_url() to templates"""
+    directory = app.config['COVER_CACHE_DIR'] or os.path.join(app.instance_path, 'covers')
+    app.extensions['cover_cache'] = CoverCache(
+        directory,
+        allowed_hosts=app.config['COVER_PROXY_HOSTS'],
+        timeout=(app.config['GOOGLE_BOOKS_CONNECT_TIMEOUT'], app.config['GOOGLE_BOOKS_READ_TIMEOUT']),
+        max_bytes=app.config['COVER_MAX_BYTES']
+    )
+    app.add_template_global(cover_url)
+
+def get_cover_cache():
+    """Return the cover cache for the current app"""
+    return current_app.extensions['cover_cache']
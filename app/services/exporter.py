@@ -0,0 +1,102 @@
+import csv
+import json
+from flask import current_app
+from sqlalchemy import and_, func, select
+from app import db
+from app.models import Book, Challenge, ChallengeBook, ReadingProgress, Review, Work
+
+# Columns of an exported library entry, in CSV column order
+EXPORT_FIELDS = (
+    'book_id', 'title', 'authors', 'published_date', 'page_count', 'google_books_id', 'categories', 'date_added',
+    'status', 'progress', 'progress_type', 'start_date', 'end_date',
+    'rating', 'review', 'reviewed_at', 'challenges'
+)
+
+def _library_query(user_id):
+    """Library entries with their work, reading progress, review and challenges, ordered by book id.
+    
+    An entry has one row per challenge it is in.
+    """
+    books = Book.__table__
+    works = Work.__table__
+    progress = ReadingProgress.__table__
+    reviews = Review.__table__
+    entries = ChallengeBook.__table__
+    challenges = Challenge.__table__
+    
+    # Books with several progress rows (from before progress was one per book) export the newest
+    latest = progress.alias('latest_progress')
+    latest_progress_id = select(func.max(latest.c.id)).where(
+        latest.c.book_id == books.c.id, latest.c.user_id == books.c.user_id
+    ).scalar_subquery()
+    
+    return select(
+        books.c.id.label('book_id'), works.c.title, works.c.authors, works.c.published_date, works.c.page_count,
+        works.c.google_books_id, books.c.categories, books.c.date_added,
+        progress.c.status, progress.c.progress, progress.c.progress_type, progress.c.start_date, progress.c.end_date,
+        reviews.c.rating, reviews.c.review_text.label('review'), reviews.c.updated_at.label('reviewed_at'),
+        challenges.c.id.label('challenge_id'), challenges.c.title.label('challenge_title'), challenges.c.goal
+    ).select_from(
+        books.join(works, works.c.id == books.c.work_id)
+        .outerjoin(progress, progress.c.id == latest_progress_id)
+        .outerjoin(reviews, and_(reviews.c.book_id == books.c.id, reviews.c.user_id == user_id))
+        .outerjoin(entries, entries.c.book_id == books.c.id)
+        .outerjoin(challenges, and_(challenges.c.id == entries.c.challenge_id, challenges.c.user_id == user_id))
+    ).where(books.c.user_id == user_id).order_by(books.c.id, challenges.c.id)
+
+def iter_library_export(user_id, batch_size=None):
+    """Yield a user's library as lists of entry dicts, one list per batch, reading rows as they stream in"""
+    batch_size = batch_size or current_app.config['EXPORT_BATCH_SIZE']
+    
+    # One query over a server-side cursor, folding each entry's consecutive rows into one dict
+    with db.engine.connect() as connection:
+        result = connection.execution_options(yield_per=batch_size).execute(_library_query(user_id))
+        entry = None
+        for rows in result.partitions():
+            entries = []
+            for row in rows:
+                if entry is None or row.book_id != entry['book_id']:
+                    if entry is not None:
+                        entries.append(entry)
+                    entry = {field: row._mapping[field] for field in EXPORT_FIELDS if field != 'challenges'}
+                    entry['challenges'] = []
+                    challenge_ids = set()
+                if row.challenge_id is not None and row.challenge_id not in challenge_ids:
+                    challenge_ids.add(row.challenge_id)
+                    entry['challenges'].append(row.challenge_title or f'{row.goal} book challenge')
+            # The last entry may continue in the next batch
+            if entries:
+                yield entries
+        if entry is not None:
+            yield [entry]
+
+def _text(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+class _Echo:
+    """File-like object whose write() hands back the text, so csv.writer can format rows for a generator"""
+    def write(self, value):
+        return value
+
+def export_csv(user_id, batch_size=None):
+    """Generate the library as CSV text chunks (challenges separated by semicolons)"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for entries in iter_library_export(user_id, batch_size):
+        yield ''.join(writer.writerow([
+            '; '.join(entry['challenges']) if field == 'challenges' else _text(entry[field])
+            for field in EXPORT_FIELDS
+        ]) for entry in entries)
+
+def export_ndjson(user_id, batch_size=None):
+    """Generate the library as JSON Lines chunks, one object per entry"""
+    for entries in iter_library_export(user_id, batch_size):
+        yield ''.join(
+            json.dumps({field: _text(entry[field]) for field in EXPORT_FIELDS}) + '\n' for entry in entries
+        )
+
+# Format name -> (chunk generator, content type, file extension)
+EXPORT_FORMATS = {
+    'csv': (export_csv, 'text/csv', 'csv'),
+    'ndjson': (export_ndjson, 'application/x-ndjson', 'jsonl'),
+}
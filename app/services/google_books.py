@@ -0,0 +1,169 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from requests.adapters import HTTPAdapter
+from flask import current_app
+
+# Upstream responses worth retrying
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of calling Google Books while the circuit breaker is open"""
+
+class CircuitBreaker:
+    """Fail fast after repeated upstream failures, then let a single trial call through"""
+    
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+    
+    def allow_request(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+    
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+    
+    def release_trial(self):
+        """End a trial call without an outcome (it failed for reasons unrelated to the upstream)"""
+        with self._lock:
+            self._trial_in_flight = False
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+class GoogleBooksClient:
+    """Pooled, keep-alive Google Books API client with retries and a circuit breaker"""
+    
+    def __init__(self, base_url, api_key='', connect_timeout=3.05, read_timeout=10,
+                 max_retries=2, backoff=0.25, pool_size=10, breaker=None):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        # Fans out paginated searches; sized like the connection pool so requests don't queue for a connection
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='google-books')
+    
+    def _sleep_before_retry(self, attempt):
+        # Exponential backoff with full jitter
+        time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+    
+    def get(self, path, params=None):
+        """GET a Google Books resource, retrying transient failures"""
+        if not self.breaker.allow_request():
+            raise CircuitOpenError('Google Books is unavailable, skipping request')
+        
+        params = dict(params or {})
+        if self.api_key:
+            params['key'] = self.api_key
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        
+        # Every way out records an outcome or releases the breaker's trial, or a half-open breaker stays stuck
+        succeeded = None
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    response = self.session.get(url, params=params, timeout=self.timeout)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                    if attempt == self.max_retries:
+                        raise
+                else:
+                    if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                        succeeded = response.status_code not in RETRY_STATUSES
+                        return response
+                self._sleep_before_retry(attempt)
+        except requests.exceptions.RequestException:
+            # Also broken bodies, bad encodings and redirect loops, which aren't worth retrying
+            succeeded = False
+            raise
+        finally:
+            if succeeded is True:
+                self.breaker.record_success()
+            elif succeeded is False:
+                self.breaker.record_failure()
+            else:
+                self.breaker.release_trial()
+    
+    def search(self, query, max_results=40, start_index=0):
+        """Search volumes, returning the decoded response or None on an API error"""
+        response = self.get('volumes', {
+            'q': query,
+            'maxResults': max_results,
+            'startIndex': start_index
+        })
+        if response.status_code != 200:
+            return None
+        return response.json()
+    
+    def search_pages(self, query, pages, page_size=40):
+        """Fetch several result pages concurrently, yielding (start_index, response or None) as each arrives"""
+        futures = {
+            self.executor.submit(self.search, query, page_size, page * page_size): page * page_size
+            for page in range(pages)
+        }
+        for future in as_completed(futures):
+            try:
+                data = future.result()
+            except requests.exceptions.RequestException:
+                data = None
+            yield futures[future], data
+    
+    def get_volume(self, google_id):
+        """Fetch a single volume, returning the decoded resource or None on an API error"""
+        response = self.get(f'volumes/{google_id}')
+        if response.status_code != 200:
+            return None
+        return response.json()
+
+def init_google_books(app):
+    """Create the shared Google Books client for this app"""
+    app.extensions['google_books'] = GoogleBooksClient(
+        base_url=app.config['GOOGLE_BOOKS_API_URL'],
+        api_key=app.config['GOOGLE_BOOKS_API_KEY'],
+        connect_timeout=app.config['GOOGLE_BOOKS_CONNECT_TIMEOUT'],
+        read_timeout=app.config['GOOGLE_BOOKS_READ_TIMEOUT'],
+        max_retries=app.config['GOOGLE_BOOKS_MAX_RETRIES'],
+        pool_size=app.config['GOOGLE_BOOKS_POOL_SIZE'],
+        breaker=CircuitBreaker(
+            failure_threshold=app.config['GOOGLE_BOOKS_BREAKER_THRESHOLD'],
+            reset_timeout=app.config['GOOGLE_BOOKS_BREAKER_RESET']
+        )
+    )
+
+def get_google_books_client():
+    """Return the Google Books client for the current app"""
+    return current_app.extensions['google_books']
@@ -0,0 +1,332 @@
+import csv
+import os
+import shutil
+from datetime import datetime
+from itertools import islice
+from flask import current_app
+from sqlalchemy import select
+from app import db
+from app.models import (
+    RATINGS, Book, Category, LibraryImport, ReadingProgress, Review, Work, book_categories, render_review_html
+)
+from app.services.jobs import enqueue, job_handler
+from app.services.library_search import get_library_search
+from app.services.ratings import compute_rating_summaries, write_rating_summary
+from app.services.stats import compute_user_stats, empty_user_stats, write_user_stats
+
+# Job kind that runs (and, after a failure or restart, resumes) an import
+IMPORT_JOB = 'library_import'
+
+# Goodreads exclusive shelf -> ReadingProgress.status; custom exclusive shelves become want_to_read
+SHELF_STATUSES = {
+    'read': 'finished',
+    'currently-reading': 'reading',
+    'to-read': 'want_to_read',
+}
+
+# Goodreads writes dates as YYYY/MM/DD
+DATE_FORMATS = ('%Y/%m/%d', '%Y-%m-%d')
+
+# Work columns filled from an export row
+WORK_FIELDS = ('title', 'authors', 'page_count', 'published_date', 'avg_rating')
+
+class LibraryImportError(Exception):
+    """Raised when an uploaded file isn't a usable library export"""
+
+class _RunSuperseded(Exception):
+    """Raised inside a batch transaction when another run has already imported the batch"""
+
+def import_path(import_id):
+    """Where the uploaded export of an import is kept until the import finishes"""
+    directory = current_app.config['IMPORT_DIR'] or os.path.join(current_app.instance_path, 'imports')
+    return os.path.join(directory, f'{import_id}.csv')
+
+def _open(path):
+    # Goodreads exports are UTF-8, sometimes with a byte order mark
+    return open(path, newline='', encoding='utf-8-sig')
+
+def count_rows(path):
+    """Check the header and count the data rows of an export without loading it into memory"""
+    try:
+        with _open(path) as handle:
+            reader = csv.reader(handle)
+            header = next(reader, None)
+            if not header or 'Title' not in header:
+                raise LibraryImportError('This is not a Goodreads library export: it has no Title column.')
+            # Rows, not lines: reviews may span several lines inside quotes
+            return sum(1 for row in reader)
+    except (UnicodeDecodeError, csv.Error) as exc:
+        raise LibraryImportError(f'The file could not be read as CSV: {exc}') from exc
+
+def create_import(user_id, filename, source, queue=True):
+    """Store an export read from a file object and record its import, queuing it to run in the background"""
+    library_import = LibraryImport(user_id=user_id, filename=filename[:255])
+    db.session.add(library_import)
+    db.session.flush()
+    
+    path = import_path(library_import.id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as target:
+        shutil.copyfileobj(source, target, 64 * 1024)
+    try:
+        library_import.total_rows = count_rows(path)
+    except LibraryImportError:
+        db.session.rollback()
+        os.remove(path)
+        raise
+    
+    if queue:
+        enqueue(IMPORT_JOB, str(library_import.id))
+    db.session.commit()
+    return library_import
+
+def resume_import(library_import):
+    """Queue an unfinished import to continue from its last committed batch"""
+    enqueue(IMPORT_JOB, str(library_import.id))
+    db.session.commit()
+
+def _parse_date(value):
+    value = (value or '').strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+    return None
+
+def _parse_number(value, kind=int):
+    try:
+        return kind(float(value))
+    except (TypeError, ValueError):
+        return None
+
+def parse_goodreads_row(row):
+    """Map a Goodreads export row to the values of a library entry, or None when it has no title"""
+    title = (row.get('Title') or '').strip()
+    if not title:
+        return None
+    
+    authors = []
+    for name in [row.get('Author') or ''] + (row.get('Additional Authors') or '').split(','):
+        name = name.strip()
+        if name and name not in authors:
+            authors.append(name)
+    
+    status = SHELF_STATUSES.get((row.get('Exclusive Shelf') or '').strip(), 'want_to_read')
+    date_added = _parse_date(row.get('Date Added'))
+    rating = _parse_number(row.get('My Rating'))
+    published = (row.get('Original Publication Year') or row.get('Year Published') or '').strip()
+    
+    return {
+        'title': title[:255],
+        'authors': (', '.join(authors) or 'Unknown Author')[:255],
+        'page_count': _parse_number(row.get('Number of Pages')) or None,
+        'published_date': published[:20] or None,
+        'avg_rating': _parse_number(row.get('Average Rating'), float),
+        'status': status,
+        # Older exports have no start date; a book being read was at least started when it was shelved
+        'start_date': _parse_date(row.get('Date Started')) or (date_added if status == 'reading' else None),
+        'end_date': _parse_date(row.get('Date Read')) if status == 'finished' else None,
+        'date_added': date_added,
+        # Goodreads writes 0 for unrated books, and a review can't be stored without a rating
+        'rating': rating if rating in RATINGS else None,
+        'review_text': (row.get('My Review') or '').strip() or None,
+        # Shelves other than the reading status ones become categories
+        'categories': [name[:255] for name in Category.parse(row.get('Bookshelves')) if name not in SHELF_STATUSES],
+    }
+
+def _entry_key(title, authors):
+    return title.casefold(), authors.casefold()
+
+def _library_keys(connection, user_id):
+    """(title, authors) of every book already in a user's library, so re-imported rows are skipped"""
+    books = Book.__table__
+    works = Work.__table__
+    rows = connection.execute(
+        select(works.c.title, works.c.authors)
+        .select_from(books.join(works, works.c.id == books.c.work_id))
+        .where(books.c.user_id == user_id)
+    )
+    return {_entry_key(title, authors) for title, authors in rows}
+
+def _insert_returning_ids(connection, table, rows):
+    """Insert rows with one executemany, returning their new ids in row order"""
+    if connection.dialect.insert_executemany_returning_sort_by_parameter_order:
+        result = connection.execute(table.insert().returning(table.c.id, sort_by_parameter_order=True), rows)
+        return list(result.scalars())
+    # MySQL can't return the ids of a multi-row insert
+    return [connection.execute(table.insert(), row).inserted_primary_key[0] for row in rows]
+
+def _category_ids(connection, user_id, names):
+    """{name: category id} for a user's categories, creating the missing ones"""
+    categories = Category.__table__
+    names = set(names)
+    if not names:
+        return {}
+    query = select(categories.c.name, categories.c.id).where(
+        categories.c.user_id == user_id, categories.c.name.in_(names)
+    )
+    ids = dict(connection.execute(query).all())
+    missing = names - set(ids)
+    if missing:
+        connection.execute(categories.insert(), [{'user_id': user_id, 'name': name} for name in sorted(missing)])
+        ids.update(connection.execute(query).all())
+    return ids
+
+def write_import_batch(connection, user_id, entries):
+    """Insert parsed entries with one executemany per table, returning (book_ids, work_ids)"""
+    now = datetime.utcnow()
+    
+    # Imported books get a catalog work of their own, like manually added ones
+    work_ids = _insert_returning_ids(connection, Work.__table__, [
+        {field: entry[field] for field in WORK_FIELDS} for entry in entries
+    ])
+    book_ids = _insert_returning_ids(connection, Book.__table__, [
+        {
+            'work_id': work_id,
+            'user_id': user_id,
+            'categories': ', '.join(entry['categories']),
+            'date_added': entry['date_added'] or now
+        }
+        for work_id, entry in zip(work_ids, entries)
+    ])
+    
+    connection.execute(ReadingProgress.__table__.insert(), [
+        {
+            'user_id': user_id,
+            'book_id': book_id,
+            'status': entry['status'],
+            'progress': 100 if entry['status'] == 'finished' else 0,
+            'progress_type': 'percentage',
+            'start_date': entry['start_date'],
+            'end_date': entry['end_date'],
+            'last_updated': entry['end_date'] or entry['start_date'] or entry['date_added'] or now
+        }
+        for book_id, entry in zip(book_ids, entries)
+    ])
+    
+    reviews = []
+    for book_id, entry in zip(book_ids, entries):
+        if entry['rating'] is None:
+            continue
+        stamp = entry['end_date'] or entry['date_added'] or now
+        reviews.append({
+            'user_id': user_id,
+            'book_id': book_id,
+            'rating': entry['rating'],
+            'review_text': entry['review_text'],
+            'timestamp': stamp,
+            'updated_at': stamp,
+            'review_html': render_review_html(entry['review_text']),
+            'review_html_updated_at': stamp
+        })
+    if reviews:
+        connection.execute(Review.__table__.insert(), reviews)
+    
+    category_ids = _category_ids(connection, user_id, [name for entry in entries for name in entry['categories']])
+    links = [
+        {'book_id': book_id, 'category_id': category_ids[name]}
+        for book_id, entry in zip(book_ids, entries)
+        for name in entry['categories']
+    ]
+    if links:
+        connection.execute(book_categories.insert(), links)
+    
+    return book_ids, work_ids
+
+def _refresh_derived(connection, user_id, book_ids, work_ids, index):
+    """Bring summaries and the search index up to date; Core inserts skip the ORM events that maintain them"""
+    computed = compute_user_stats(connection, [user_id])
+    write_user_stats(connection, user_id, computed.get(user_id, empty_user_stats()))
+    ratings = compute_rating_summaries(connection, work_ids)
+    for work_id, rating in ratings.items():
+        write_rating_summary(connection, work_id, rating)
+    if index is not None:
+        index.update(book_ids, connection)
+
+def run_import(import_id, batch_size=None, progress=None):
+    """Import a stored export in batches, each written in one transaction together with its progress.
+    
+    A run that stops part way (crash, restart, failed batch) picks up after the last committed batch. A run that
+    finds another one has got ahead of it stops, leaving the import to that run.
+    progress, if given, is called with the number of rows processed after every batch.
+    """
+    library_import = db.session.get(LibraryImport, import_id)
+    if library_import is None or library_import.status == 'done':
+        return library_import
+    batch_size = batch_size or current_app.config['IMPORT_BATCH_SIZE']
+    user_id = library_import.user_id
+    position = library_import.processed_rows
+    
+    library_import.status = 'running'
+    library_import.error = None
+    db.session.commit()
+    
+    imports = LibraryImport.__table__
+    index = get_library_search()
+    try:
+        with db.engine.connect() as connection:
+            seen = _library_keys(connection, user_id)
+        
+        with _open(import_path(import_id)) as handle:
+            rows = islice(csv.DictReader(handle), position, None)
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                
+                entries = []
+                for row in batch:
+                    entry = parse_goodreads_row(row)
+                    if entry is None or _entry_key(entry['title'], entry['authors']) in seen:
+                        continue
+                    seen.add(_entry_key(entry['title'], entry['authors']))
+                    entries.append(entry)
+                
+                with db.engine.begin() as connection:
+                    # Only the run that read from this position may advance it, so overlapping runs can't
+                    # import a batch twice
+                    advanced = connection.execute(imports.update().where(
+                        imports.c.id == import_id, imports.c.processed_rows == position
+                    ).values(
+                        processed_rows=position + len(batch),
+                        imported_count=imports.c.imported_count + len(entries),
+                        skipped_count=imports.c.skipped_count + len(batch) - len(entries),
+                        updated_at=datetime.utcnow()
+                    ))
+                    if not advanced.rowcount:
+                        raise _RunSuperseded()
+                    if entries:
+                        book_ids, work_ids = write_import_batch(connection, user_id, entries)
+                        _refresh_derived(connection, user_id, book_ids, work_ids, index)
+                
+                position += len(batch)
+                if progress is not None:
+                    progress(position)
+    except _RunSuperseded:
+        # Not a failure: the run that got ahead carries on and records how the import ends
+        db.session.rollback()
+        db.session.refresh(library_import)
+        return library_import
+    except Exception as exc:
+        db.session.rollback()
+        db.session.refresh(library_import)
+        library_import.status = 'failed'
+        library_import.error = f'{type(exc).__name__}: {exc}'
+        db.session.commit()
+        raise
+    
+    db.session.refresh(library_import)
+    library_import.status = 'done'
+    library_import.finished_at = datetime.utcnow()
+    db.session.commit()
+    # Finished imports can't be resumed, so the upload is no longer needed
+    path = import_path(import_id)
+    if os.path.exists(path):
+        os.remove(path)
+    return library_import
+
+@job_handler(IMPORT_JOB)
+def run_import_job(import_id):
+    """Background job: run or resume an import (failed attempts are retried from where they stopped)"""
+    run_import(int(import_id))
@@ -0,0 +1,234 @@
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import and_, event, func, or_, select
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import Job
+
+# Job kind -> callable taking the job key, registered with @job_handler
+JOB_HANDLERS = {}
+
+# Key under session.info flagging that the workers should wake up after the commit
+NOTIFY_KEY = 'job_queue_notify'
+
+# Candidate jobs read per claim attempt
+CLAIM_BATCH = 5
+
+# Finished jobs the latency figures are computed over
+LATENCY_SAMPLE = 200
+
+def job_handler(kind):
+    """Register the decorated function as the handler for a job kind"""
+    def register(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return register
+
+def enqueue(kind, key):
+    """Queue a job in the current session, reusing the pending or running job for the same key"""
+    job = Job.query.filter_by(kind=kind, key=key).first()
+    if job is None:
+        # The unique constraint on (kind, key) makes concurrent enqueues collapse into one job
+        try:
+            with db.session.begin_nested():
+                job = Job(kind=kind, key=key)
+                db.session.add(job)
+        except IntegrityError:
+            job = Job.query.filter_by(kind=kind, key=key).one()
+    if job.status in ('done', 'failed'):
+        job.requeue()
+    
+    db.session.info[NOTIFY_KEY] = True
+    return job
+
+class JobQueue:
+    """In-process worker pool running jobs from the jobs table with retries and backoff"""
+    
+    def __init__(self, app, workers=2, max_attempts=5, backoff=5, max_backoff=3600, poll_interval=2.0, lease=300):
+        self.app = app
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self._threads = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+    
+    def start(self):
+        """Start the worker threads once per process"""
+        if self._threads or not self.workers:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping.clear()
+            for index in range(self.workers):
+                thread = threading.Thread(target=self.work, name=f'job-worker-{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+    
+    def stop(self, timeout=10):
+        """Ask the workers to finish their current job and exit"""
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+    
+    def notify(self):
+        """Wake idle workers because new jobs were committed"""
+        self._wakeup.set()
+    
+    def work(self):
+        """Run jobs until stopped, sleeping up to poll_interval while the queue is empty"""
+        while not self._stopping.is_set():
+            try:
+                ran = self.run_next()
+            except Exception:
+                self.app.logger.exception('Job worker failed to claim a job')
+                ran = False
+            if not ran:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+    
+    def run_pending(self):
+        """Run every job that is due now in the calling thread, returning how many ran"""
+        count = 0
+        while self.run_next():
+            count += 1
+        return count
+    
+    def retry_delay(self, attempts):
+        """Seconds to wait before retrying a job that has failed attempts times"""
+        return min(self.max_backoff, self.backoff * 2 ** (attempts - 1))
+    
+    def _claim(self):
+        """Mark one due job as running, returning (id, kind, key, attempts, started_at) or None"""
+        jobs = Job.__table__
+        now = datetime.utcnow()
+        # Whole seconds, so the lease reads back unchanged from MySQL DATETIME columns
+        lease_start = now.replace(microsecond=0)
+        
+        with db.engine.begin() as connection:
+            candidates = connection.execute(
+                select(jobs.c.id, jobs.c.kind, jobs.c.key, jobs.c.status, jobs.c.attempts, jobs.c.started_at).where(or_(
+                    and_(jobs.c.status == 'pending', jobs.c.run_at <= now),
+                    # A worker that died mid-job loses its lease
+                    and_(jobs.c.status == 'running', jobs.c.started_at < now - timedelta(seconds=self.lease))
+                )).order_by(jobs.c.run_at).limit(CLAIM_BATCH)
+            ).all()
+            
+            for row in candidates:
+                # Only one worker (or process) wins the compare-and-set on status and lease
+                claimed = connection.execute(jobs.update().where(
+                    jobs.c.id == row.id,
+                    jobs.c.status == row.status,
+                    jobs.c.started_at.is_not_distinct_from(row.started_at)
+                ).values(status='running', started_at=lease_start, attempts=jobs.c.attempts + 1))
+                if claimed.rowcount:
+                    return row.id, row.kind, row.key, row.attempts + 1, lease_start
+        return None
+    
+    def _finish(self, job_id, attempts, started_at, error=None):
+        jobs = Job.__table__
+        now = datetime.utcnow()
+        
+        if error is None:
+            values = {'status': 'done', 'finished_at': now, 'last_error': None}
+        elif attempts >= self.max_attempts:
+            values = {'status': 'failed', 'finished_at': now, 'last_error': error}
+        else:
+            values = {'status': 'pending', 'run_at': now + timedelta(seconds=self.retry_delay(attempts)), 'last_error': error}
+        
+        with db.engine.begin() as connection:
+            connection.execute(jobs.update().where(
+                jobs.c.id == job_id, jobs.c.status == 'running', jobs.c.started_at == started_at
+            ).values(**values))
+    
+    def run_next(self):
+        """Claim and run one due job, returning False when there was none"""
+        with self.app.app_context():
+            claimed = self._claim()
+            if claimed is None:
+                return False
+            job_id, kind, key, attempts, started_at = claimed
+            
+            error = None
+            handler = JOB_HANDLERS.get(kind)
+            if handler is None:
+                error = f'No handler registered for job kind {kind!r}'
+            elif attempts > self.max_attempts:
+                error = 'Gave up after the worker running it stopped responding'
+            else:
+                try:
+                    handler(key)
+                except Exception as exc:
+                    db.session.rollback()
+                    error = f'{type(exc).__name__}: {exc}'
+            
+            if error is not None:
+                self.app.logger.warning('Job %s %s(%s) failed on attempt %d: %s', job_id, kind, key, attempts, error)
+            self._finish(job_id, attempts, started_at, error)
+            return True
+    
+    def stats(self):
+        """Queue depth per status and wait/run latency over the most recently finished jobs"""
+        now = datetime.utcnow()
+        
+        depth = dict(db.session.query(Job.status, func.count()).group_by(Job.status).all())
+        due = Job.query.filter(Job.status == 'pending', Job.run_at <= now).count()
+        oldest = db.session.query(func.min(Job.enqueued_at)).filter(Job.status == 'pending').scalar()
+        
+        finished = db.session.query(Job.enqueued_at, Job.started_at, Job.finished_at).filter(
+            Job.status == 'done'
+        ).order_by(Job.finished_at.desc()).limit(LATENCY_SAMPLE).all()
+        # Leases are whole seconds, so a job picked up at once can appear to have started before it was queued
+        waits = [max(0, (started - enqueued).total_seconds()) for enqueued, started, done in finished]
+        runs = [(done - started).total_seconds() for enqueued, started, done in finished]
+        
+        return {
+            'depth': {status: depth.get(status, 0) for status in ('pending', 'running', 'done', 'failed')},
+            'due': due,
+            'oldest_pending_age': (now - oldest).total_seconds() if oldest else 0,
+            'sample': len(finished),
+            'wait_avg': sum(waits) / len(waits) if waits else 0,
+            'wait_max': max(waits, default=0),
+            'run_avg': sum(runs) / len(runs) if runs else 0,
+            'run_max': max(runs, default=0),
+        }
+
+def _notify_after_commit(session):
+    if session.info.pop(NOTIFY_KEY, None):
+        queue = current_app.extensions.get('job_queue')
+        if queue is not None:
+            queue.notify()
+
+def _discard_notify(session):
+    session.info.pop(NOTIFY_KEY, None)
+
+def init_job_queue(app):
+    """Create the job queue; its workers start with the first request (JOB_WORKERS=0 leaves that to 'flask run-jobs')"""
+    queue = JobQueue(
+        app,
+        workers=app.config['JOB_WORKERS'],
+        max_attempts=app.config['JOB_MAX_ATTEMPTS'],
+        backoff=app.config['JOB_RETRY_BACKOFF'],
+        max_backoff=app.config['JOB_RETRY_MAX_BACKOFF'],
+        poll_interval=app.config['JOB_POLL_INTERVAL'],
+        lease=app.config['JOB_LEASE']
+    )
+    app.extensions['job_queue'] = queue
+    # Not at import time: CLI commands such as 'flask db upgrade' must not start workers
+    app.before_request(queue.start)
+    
+    if not event.contains(db.session, 'after_commit', _notify_after_commit):
+        event.listen(db.session, 'after_commit', _notify_after_commit)
+        event.listen(db.session, 'after_rollback', _discard_notify)
+
+def get_job_queue():
+    """Return the job queue for the current app"""
+    return current_app.extensions['job_queue']
@@ -0,0 +1,225 @@
+import re
+from abc import ABC, abstractmethod
+from flask import current_app
+from sqlalchemy import event, text
+from app import db
+from app.models import Book, Review, Work
+
+# Keys under session.info where changed book and work ids wait for the commit
+PENDING_KEY = 'library_search_pending'
+PENDING_WORKS_KEY = 'library_search_pending_works'
+
+# Work columns copied into the index
+INDEXED_WORK_ATTRIBUTES = ('title', 'authors', 'description')
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+def tokenize(query):
+    """Split a user query into plain word tokens, dropping any search operators"""
+    return TOKEN_RE.findall((query or '').lower())
+
+class LibrarySearchIndex(ABC):
+    """Inverted index over each user's books and review text, stored in tables the migrations create"""
+    
+    @abstractmethod
+    def _clear(self, connection):
+        """Delete every document"""
+    
+    @abstractmethod
+    def _replace(self, connection, document):
+        """Insert a document, replacing any indexed for the same book"""
+    
+    @abstractmethod
+    def _delete(self, connection, book_id):
+        """Delete the document of a book"""
+    
+    @abstractmethod
+    def _search(self, connection, user_id, tokens, limit):
+        """Return (book_id, score) rows for a user's documents matching every token"""
+    
+    def _documents(self, connection, book_ids=None):
+        """Yield index documents (book fields plus concatenated review text) for books"""
+        books = Book.__table__
+        works = Work.__table__
+        reviews = Review.__table__
+        
+        query = books.join(works, works.c.id == books.c.work_id).select().with_only_columns(
+            books.c.id, books.c.user_id, works.c.title, works.c.authors, works.c.description
+        )
+        if book_ids is not None:
+            query = query.where(books.c.id.in_(book_ids))
+        
+        review_query = reviews.select().with_only_columns(reviews.c.book_id, reviews.c.review_text).where(
+            reviews.c.review_text.isnot(None)
+        )
+        if book_ids is not None:
+            review_query = review_query.where(reviews.c.book_id.in_(book_ids))
+        review_text = {}
+        for book_id, body in connection.execute(review_query):
+            review_text.setdefault(book_id, []).append(body)
+        
+        for row in connection.execute(query):
+            yield {
+                'book_id': row.id,
+                'user_id': row.user_id,
+                'title': row.title or '',
+                'authors': row.authors or '',
+                'description': row.description or '',
+                'reviews': '\n'.join(review_text.get(row.id, []))
+            }
+    
+    def update(self, book_ids, connection=None):
+        """Re-index the given books, dropping any that no longer exist.
+        
+        Pass a connection to write in the caller's transaction.
+        """
+        book_ids = set(book_ids)
+        if not book_ids:
+            return
+        if connection is None:
+            with db.engine.begin() as connection:
+                self._update(connection, book_ids)
+        else:
+            self._update(connection, book_ids)
+    
+    def _update(self, connection, book_ids):
+        found = set()
+        for document in self._documents(connection, book_ids):
+            self._replace(connection, document)
+            found.add(document['book_id'])
+        for book_id in book_ids - found:
+            self._delete(connection, book_id)
+    
+    def rebuild(self):
+        """Drop and re-create every document in the index, returning the number indexed"""
+        count = 0
+        with db.engine.begin() as connection:
+            self._clear(connection)
+            for document in self._documents(connection):
+                self._replace(connection, document)
+                count += 1
+        return count
+    
+    def search(self, user_id, query, limit=50):
+        """Return (book_id, score) pairs for a user's books, best match first"""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        with db.engine.connect() as connection:
+            return [(row[0], row[1]) for row in self._search(connection, user_id, tokens, limit)]
+
+class SQLiteFTSIndex(LibrarySearchIndex):
+    """Library search backed by an SQLite FTS5 virtual table ranked with bm25"""
+    
+    def _clear(self, connection):
+        connection.execute(text("DELETE FROM library_fts"))
+    
+    def _replace(self, connection, document):
+        self._delete(connection, document['book_id'])
+        connection.execute(text(
+            "INSERT INTO library_fts (rowid, owner, title, authors, description, reviews) "
+            "VALUES (:book_id, :owner, :title, :authors, :description, :reviews)"
+        ), dict(document, owner=f"u{document['user_id']}"))
+    
+    def _delete(self, connection, book_id):
+        connection.execute(text("DELETE FROM library_fts WHERE rowid = :book_id"), {'book_id': book_id})
+    
+    def _search(self, connection, user_id, tokens, limit):
+        terms = ' '.join(f'"{token}"*' for token in tokens)
+        match = f'owner:u{int(user_id)} AND {{title authors description reviews}}: ({terms})'
+        return connection.execute(text(
+            "SELECT rowid, -bm25(library_fts, 0.0, 10.0, 5.0, 1.0, 2.0) AS score "
+            "FROM library_fts WHERE library_fts MATCH :match "
+            "ORDER BY score DESC LIMIT :limit"
+        ), {'match': match, 'limit': limit})
+
+class MySQLFullTextIndex(LibrarySearchIndex):
+    """Library search backed by an InnoDB FULLTEXT index in boolean mode"""
+    
+    # InnoDB ignores shorter words (innodb_ft_min_token_size), so they can't be required
+    MIN_TOKEN_SIZE = 3
+    
+    def _clear(self, connection):
+        connection.execute(text("DELETE FROM library_search"))
+    
+    def _replace(self, connection, document):
+        connection.execute(text(
+            "REPLACE INTO library_search (book_id, user_id, title, authors, description, reviews) "
+            "VALUES (:book_id, :user_id, :title, :authors, :description, :reviews)"
+        ), document)
+    
+    def _delete(self, connection, book_id):
+        connection.execute(text("DELETE FROM library_search WHERE book_id = :book_id"), {'book_id': book_id})
+    
+    def _search(self, connection, user_id, tokens, limit):
+        terms = ' '.join(f'+{token}*' for token in tokens if len(token) >= self.MIN_TOKEN_SIZE)
+        if not terms:
+            return []
+        return connection.execute(text(
+            "SELECT book_id, MATCH (title, authors, description, reviews) AGAINST (:terms IN BOOLEAN MODE) AS score "
+            "FROM library_search "
+            "WHERE user_id = :user_id AND MATCH (title, authors, description, reviews) AGAINST (:terms IN BOOLEAN MODE) "
+            "ORDER BY score DESC LIMIT :limit"
+        ), {'terms': terms, 'user_id': user_id, 'limit': limit})
+
+INDEX_BACKENDS = {
+    'sqlite': SQLiteFTSIndex,
+    'mysql': MySQLFullTextIndex,
+}
+
+def _collect_changes(session, flush_context):
+    """Remember which books were touched in this flush so they can be re-indexed on commit"""
+    pending = session.info.setdefault(PENDING_KEY, set())
+    pending_works = session.info.setdefault(PENDING_WORKS_KEY, set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Book):
+            pending.add(obj.id)
+        elif isinstance(obj, Review):
+            pending.add(obj.book_id)
+        elif isinstance(obj, Work) and obj in session.dirty:
+            # Searches refresh works all the time; only text changes reach the index
+            state = db.inspect(obj)
+            if any(state.attrs[attribute].history.has_changes() for attribute in INDEXED_WORK_ATTRIBUTES):
+                pending_works.add(obj.id)
+
+def _apply_changes(session):
+    pending = session.info.pop(PENDING_KEY, None) or set()
+    pending_works = session.info.pop(PENDING_WORKS_KEY, None)
+    if pending or pending_works:
+        pending.discard(None)
+        try:
+            if pending_works:
+                # Every library entry of a changed work carries its text
+                books = Book.__table__
+                with db.engine.connect() as connection:
+                    pending.update(row[0] for row in connection.execute(
+                        books.select().with_only_columns(books.c.id).where(books.c.work_id.in_(pending_works))
+                    ))
+            get_library_search().update(pending)
+        except Exception:
+            current_app.logger.exception('Failed to update library search index')
+
+def _discard_changes(session):
+    session.info.pop(PENDING_KEY, None)
+    session.info.pop(PENDING_WORKS_KEY, None)
+
+def init_library_search(app):
+    """Pick the search index for the configured database and keep it in sync with commits"""
+    with app.app_context():
+        dialect = db.engine.dialect.name
+    backend = INDEX_BACKENDS.get(dialect)
+    if backend is None:
+        app.logger.warning('Library search is not supported on %s', dialect)
+        app.extensions['library_search'] = None
+        return
+    
+    app.extensions['library_search'] = backend()
+    
+    if not event.contains(db.session, 'after_flush', _collect_changes):
+        event.listen(db.session, 'after_flush', _collect_changes)
+        event.listen(db.session, 'after_commit', _apply_changes)
+        event.listen(db.session, 'after_rollback', _discard_changes)
+
+def get_library_search():
+    """Return the library search index for the current app (None if unsupported)"""
+    return current_app.extensions.get('library_search')
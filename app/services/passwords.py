@@ -0,0 +1,68 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from app import bcrypt
+
+class PasswordHasherBusy(Exception):
+    """Raised when every password hashing slot stays taken for longer than the configured wait"""
+
+def hash_cost(pw_hash):
+    """The bcrypt cost (log2 rounds) a hash was made with, or None if it isn't a bcrypt hash"""
+    try:
+        return int(pw_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded thread pool so a burst of logins can't occupy every request worker.
+    
+    bcrypt releases the GIL, so the pool spreads hashing over the CPUs while at most max_pending hashes are
+    queued or running; callers beyond that wait up to wait_timeout seconds and then get PasswordHasherBusy.
+    """
+    
+    def __init__(self, rounds=12, workers=None, max_pending=None, wait_timeout=2.0):
+        self.rounds = rounds
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 4
+        self.wait_timeout = wait_timeout
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hasher')
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+    
+    def _run(self, function, *args):
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            raise PasswordHasherBusy('Too many password checks are in progress')
+        try:
+            future = self.executor.submit(function, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+    
+    def hash(self, password):
+        """bcrypt hash of a password at the configured cost"""
+        return self._run(bcrypt.generate_password_hash, password, self.rounds).decode('utf-8')
+    
+    def verify(self, pw_hash, password):
+        return self._run(bcrypt.check_password_hash, pw_hash, password)
+    
+    def needs_rehash(self, pw_hash):
+        """Whether a hash was made at a cost other than the configured one"""
+        return hash_cost(pw_hash) != self.rounds
+    
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+def init_password_hasher(app):
+    """Create the password hashing pool for this app"""
+    app.extensions['password_hasher'] = PasswordHasher(
+        rounds=app.config['BCRYPT_LOG_ROUNDS'],
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        max_pending=app.config['PASSWORD_HASH_MAX_PENDING'],
+        wait_timeout=app.config['PASSWORD_HASH_WAIT']
+    )
+
+def get_password_hasher():
+    """Return the password hashing pool for the current app"""
+    return current_app.extensions['password_hasher']
@@ -0,0 +1,217 @@
+import os
+import threading
+import time
+import traceback
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from app import db
+
+# Frames under this directory count as the origin of a query
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_ROOT = os.path.dirname(APP_ROOT)
+
+# Histogram bucket upper bounds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Key under connection.info holding the start times of in-flight statements
+START_KEY = 'query_profiler_start'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(**labels):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Histogram:
+    """Cumulative histogram in the Prometheus exposition model"""
+    
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+    
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+    
+    def samples(self, name, **labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{_labels(**labels, le=_number(bound))}}} {cumulative}'
+        yield f'{name}_sum{{{_labels(**labels)}}} {_number(self.sum)}'
+        yield f'{name}_count{{{_labels(**labels)}}} {self.count}'
+
+def query_origin():
+    """Return 'path:line in function' for the innermost application frame issuing a query"""
+    for frame in reversed(traceback.extract_stack()):
+        filename = os.path.abspath(frame.filename)
+        if filename.startswith(APP_ROOT) and filename != os.path.abspath(__file__):
+            return f'{os.path.relpath(filename, PROJECT_ROOT)}:{frame.lineno} in {frame.name}'
+    return 'unknown'
+
+class QueryProfiler:
+    """Counts SQL statements and database time per request and aggregates them per endpoint"""
+    
+    def __init__(self, slow_query_threshold=0.1):
+        self.slow_query_threshold = slow_query_threshold
+        self.logger = None
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._blueprints = {}
+    
+    def install(self, app, engine):
+        """Hook the profiler into an engine's cursor events and the app's request cycle"""
+        self.logger = app.logger
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(engine, 'handle_error', self._handle_error)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+    
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(START_KEY, []).append((context, time.perf_counter()))
+    
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info[START_KEY].pop()[1]
+        
+        in_request = has_request_context() and 'query_stats' in g
+        if in_request:
+            g.query_stats['statements'] += 1
+            g.query_stats['db_time'] += elapsed
+        
+        if elapsed >= self.slow_query_threshold:
+            if in_request:
+                g.query_stats['slow'] += 1
+            # Statements also run outside requests (CLI, after_commit hooks), so no current_app here
+            self.logger.warning(
+                'Slow query (%.1f ms) from %s: %s',
+                elapsed * 1000, query_origin(), ' '.join(statement.split())
+            )
+    
+    def _handle_error(self, exception_context):
+        # A failed statement never reaches after_cursor_execute; errors while fetching rows come after it
+        connection = exception_context.connection
+        if connection is None:
+            return
+        starts = connection.info.get(START_KEY)
+        if starts and starts[-1][0] is exception_context.execution_context:
+            starts.pop()
+    
+    def _before_request(self):
+        g.query_stats = {'statements': 0, 'db_time': 0.0, 'slow': 0, 'started': time.perf_counter()}
+    
+    def _after_request(self, response):
+        stats = g.pop('query_stats', None)
+        if stats is not None:
+            self.record(
+                request.blueprint or 'app', request.endpoint or 'unmatched',
+                stats['statements'], stats['db_time'], stats['slow'],
+                time.perf_counter() - stats['started']
+            )
+        return response
+    
+    def record(self, blueprint, endpoint, statements, db_time, slow, duration):
+        """Add one finished request to the aggregates"""
+        with self._lock:
+            totals = self._endpoints.setdefault((blueprint, endpoint), {
+                'requests': 0, 'statements': 0, 'db_time': 0.0, 'slow': 0, 'max_statements': 0
+            })
+            totals['requests'] += 1
+            totals['statements'] += statements
+            totals['db_time'] += db_time
+            totals['slow'] += slow
+            totals['max_statements'] = max(totals['max_statements'], statements)
+            
+            histograms = self._blueprints.get(blueprint)
+            if histograms is None:
+                histograms = self._blueprints[blueprint] = {
+                    'duration': Histogram(DURATION_BUCKETS),
+                    'db_time': Histogram(DURATION_BUCKETS),
+                    'statements': Histogram(STATEMENT_BUCKETS),
+                }
+            histograms['duration'].observe(duration)
+            histograms['db_time'].observe(db_time)
+            histograms['statements'].observe(statements)
+    
+    def endpoint_stats(self):
+        """Return {(blueprint, endpoint): totals} for every endpoint seen so far"""
+        with self._lock:
+            return {key: dict(totals) for key, totals in self._endpoints.items()}
+    
+    def render(self):
+        """Render the aggregates in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            counters = (
+                ('booktracker_requests_total', 'requests', 'Requests handled per endpoint.'),
+                ('booktracker_db_statements_total', 'statements', 'SQL statements issued per endpoint.'),
+                ('booktracker_db_seconds_total', 'db_time', 'Time spent in SQL statements per endpoint.'),
+                ('booktracker_slow_queries_total', 'slow', 'Statements above the slow query threshold per endpoint.'),
+            )
+            for name, field, description in counters:
+                lines.append(f'# HELP {name} {description}')
+                lines.append(f'# TYPE {name} counter')
+                for (blueprint, endpoint), totals in sorted(self._endpoints.items()):
+                    lines.append(f'{name}{{{_labels(blueprint=blueprint, endpoint=endpoint)}}} {_number(totals[field])}')
+            
+            name = 'booktracker_db_statements_max'
+            lines.append(f'# HELP {name} Most SQL statements issued by a single request per endpoint.')
+            lines.append(f'# TYPE {name} gauge')
+            for (blueprint, endpoint), totals in sorted(self._endpoints.items()):
+                lines.append(f'{name}{{{_labels(blueprint=blueprint, endpoint=endpoint)}}} {totals["max_statements"]}')
+            
+            histograms = (
+                ('booktracker_request_duration_seconds', 'duration', 'Request duration per blueprint.'),
+                ('booktracker_request_db_seconds', 'db_time', 'Database time per request per blueprint.'),
+                ('booktracker_request_db_statements', 'statements', 'SQL statements per request per blueprint.'),
+            )
+            for name, field, description in histograms:
+                lines.append(f'# HELP {name} {description}')
+                lines.append(f'# TYPE {name} histogram')
+                for blueprint, blueprint_histograms in sorted(self._blueprints.items()):
+                    lines.extend(blueprint_histograms[field].samples(name, blueprint=blueprint))
+        return '\n'.join(lines) + '\n'
+
+def render_search_cache_metrics(stats):
+    """Render SearchCache.stats() in Prometheus text format: counts since start as counters, the size as a gauge"""
+    lines = []
+    for name, field, metric_type, description in (
+        ('booktracker_search_cache_hits_total', 'hits', 'counter', 'Search cache hits served from this process.'),
+        ('booktracker_search_cache_shared_hits_total', 'shared_hits', 'counter',
+         'Search cache hits served from the shared backend.'),
+        ('booktracker_search_cache_misses_total', 'misses', 'counter', 'Search cache misses.'),
+        ('booktracker_search_cache_size', 'size', 'gauge', 'Entries in the in-process search cache.'),
+    ):
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        lines.append(f'{name} {stats[field]}')
+    return '\n'.join(lines) + '\n'
+
+def init_query_profiler(app):
+    """Install the query profiler when QUERY_PROFILER_ENABLED is set"""
+    if not app.config['QUERY_PROFILER_ENABLED']:
+        app.extensions['query_profiler'] = None
+        return
+    
+    profiler = QueryProfiler(slow_query_threshold=app.config['SLOW_QUERY_THRESHOLD_MS'] / 1000)
+    with app.app_context():
+        profiler.install(app, db.engine)
+    app.extensions['query_profiler'] = profiler
+
+def get_query_profiler():
+    """Return the query profiler for the current app (None if disabled)"""
+    return current_app.extensions.get('query_profiler')
@@ -0,0 +1,51 @@
+import numpy as np
+from rapidfuzz import fuzz, process, utils
+
+# Field weights for the relevance score (description is further damped by DESCRIPTION_DAMPING)
+TITLE_WEIGHT = 0.6
+AUTHOR_WEIGHT = 0.3
+DESCRIPTION_WEIGHT = 0.1
+DESCRIPTION_DAMPING = 0.3
+
+def description_tokens(description):
+    """Normalize a description and reduce it to its unique tokens.
+    
+    token_set_ratio only looks at the set of tokens, so the score is unchanged while
+    the scorer has far less text to compare.
+    """
+    return ' '.join(set(utils.default_process(description or '').split()))
+
+def rank_books(query, books):
+    """Score all search results against the query in one batch and sort them by relevance"""
+    if not books:
+        return books
+    
+    # Every string is normalized exactly once, so cdist runs without a processor
+    titles = [utils.default_process(book['title'] or '') for book in books]
+    authors = [
+        utils.default_process(
+            ', '.join(book['authors']) if isinstance(book['authors'], list) else (book['authors'] or '')
+        )
+        for book in books
+    ]
+    descriptions = [description_tokens(book['description']) for book in books]
+    
+    # One cdist call scores the query against every field of every candidate. Splitting the descriptions into
+    # tokens dominates the cost, so this runs about as fast as scoring each field with rapidfuzz in a loop
+    scores = process.cdist(
+        [utils.default_process(query)],
+        titles + authors + descriptions,
+        scorer=fuzz.token_set_ratio,
+        dtype=np.float32
+    )[0].reshape(3, len(books))
+    
+    relevance = (
+        scores[0] * TITLE_WEIGHT
+        + scores[1] * AUTHOR_WEIGHT
+        + scores[2] * DESCRIPTION_DAMPING * DESCRIPTION_WEIGHT
+    )
+    
+    for book, score in zip(books, relevance.tolist()):
+        book['relevance_score'] = score
+    books.sort(key=lambda x: x['relevance_score'], reverse=True)
+    return books
@@ -0,0 +1,160 @@
+from datetime import datetime
+from sqlalchemy import case, event, func, select
+from sqlalchemy.orm import object_session
+from app import db
+from app.models import RATINGS, Book, RatingSummary, Review, rating_summary_dict
+
+# Review attributes that affect the summary
+TRACKED_ATTRIBUTES = ('book_id', 'rating')
+
+# Session.info key of the works whose summaries the current flush rebuilds
+PENDING_REBUILDS = 'rating_summary_rebuilds'
+
+def empty_histogram():
+    return {rating: 0 for rating in RATINGS}
+
+def compute_rating_summaries(connection, work_ids=None):
+    """Aggregate reviews from scratch: {work_id: (count, sum, {rating: count})}"""
+    reviews = Review.__table__
+    books = Book.__table__
+    
+    query = select(
+        books.c.work_id, func.count(), func.sum(reviews.c.rating),
+        *(func.sum(case((reviews.c.rating == rating, 1), else_=0)) for rating in RATINGS)
+    ).select_from(reviews.join(books, books.c.id == reviews.c.book_id)).group_by(books.c.work_id)
+    if work_ids is not None:
+        query = query.where(books.c.work_id.in_(work_ids))
+    
+    return {
+        work_id: (count, int(total), dict(zip(RATINGS, (int(value) for value in histogram))))
+        for work_id, count, total, *histogram in connection.execute(query)
+    }
+
+def write_rating_summary(connection, work_id, computed):
+    """Replace a work's summary row with freshly computed values (no row when it has no reviews)"""
+    summaries = RatingSummary.__table__
+    connection.execute(summaries.delete().where(summaries.c.work_id == work_id))
+    if computed is None or not computed[0]:
+        return
+    count, total, histogram = computed
+    connection.execute(summaries.insert().values(
+        work_id=work_id, review_count=count, rating_sum=total, updated_at=datetime.utcnow(),
+        **{RatingSummary.histogram_column(rating): histogram[rating] for rating in RATINGS}
+    ))
+
+def rebuild_rating_summaries(work_ids=None):
+    """Recompute rating summaries from the reviews, returning the number of works rebuilt"""
+    with db.engine.begin() as connection:
+        computed = compute_rating_summaries(connection, work_ids)
+        if work_ids is None:
+            connection.execute(RatingSummary.__table__.delete())
+            work_ids = list(computed)
+        for work_id in work_ids:
+            write_rating_summary(connection, work_id, computed.get(work_id))
+    return len(work_ids)
+
+def get_rating_summaries(book_ids):
+    """Return {book_id: summary dict} for library entries in one query, summarizing their works' reviews"""
+    book_ids = set(book_ids)
+    summaries = {book_id: rating_summary_dict(0, 0, empty_histogram()) for book_id in book_ids}
+    if not book_ids:
+        return summaries
+    
+    rows = db.session.query(Book.id, RatingSummary).join(
+        RatingSummary, RatingSummary.work_id == Book.work_id
+    ).filter(Book.id.in_(book_ids))
+    for book_id, summary in rows:
+        summaries[book_id] = summary.to_dict()
+    return summaries
+
+def get_rating_summary(book_id):
+    """Return the rating summary dict for a single library entry"""
+    return get_rating_summaries([book_id])[book_id]
+
+# Incremental maintenance
+#
+# Each review adds 1 to its work's count, its rating to the sum and 1 to its
+# star bucket. The deltas are written on the flush connection, so they commit
+# or roll back together with the review change itself.
+
+def _work_id(connection, book_id):
+    books = Book.__table__
+    return connection.execute(select(books.c.work_id).where(books.c.id == book_id)).scalar()
+
+def _pending_rebuilds(session):
+    """Works whose summary was missing during this flush; they are rebuilt once the flush has written every row"""
+    return session.info.setdefault(PENDING_REBUILDS, set())
+
+def _apply(target, connection, changes):
+    """Apply (book_id, rating, sign) changes to the stored summaries"""
+    summaries = RatingSummary.__table__
+    pending = _pending_rebuilds(object_session(target))
+    
+    for book_id, rating, sign in changes:
+        work_id = _work_id(connection, book_id)
+        if work_id is None or rating not in RATINGS or work_id in pending:
+            continue
+        
+        bucket = RatingSummary.histogram_column(rating)
+        result = connection.execute(summaries.update().where(summaries.c.work_id == work_id).values(
+            review_count=summaries.c.review_count + sign,
+            rating_sum=summaries.c.rating_sum + sign * rating,
+            updated_at=datetime.utcnow(),
+            **{bucket: summaries.c[bucket] + sign}
+        ))
+        if result.rowcount == 0:
+            # First review of the work (or a summary lost to a crash). One built now would already count the
+            # other reviews of this flush, which their own events would then add again, so it is built once the
+            # flush is written
+            pending.add(work_id)
+        else:
+            # Drop emptied summaries so a work without reviews has no row
+            connection.execute(summaries.delete().where(
+                summaries.c.work_id == work_id, summaries.c.review_count <= 0
+            ))
+
+def _old_value(target, attribute):
+    history = db.inspect(target).attrs[attribute].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(target, attribute)
+
+@event.listens_for(Review, 'after_insert')
+def _review_inserted(mapper, connection, target):
+    _apply(target, connection, [(target.book_id, target.rating, 1)])
+
+@event.listens_for(Review, 'after_update')
+def _review_updated(mapper, connection, target):
+    state = db.inspect(target)
+    if not any(state.attrs[attribute].history.has_changes() for attribute in TRACKED_ATTRIBUTES):
+        return
+    _apply(target, connection, [
+        (_old_value(target, 'book_id'), _old_value(target, 'rating'), -1),
+        (target.book_id, target.rating, 1)
+    ])
+
+@event.listens_for(Review, 'after_delete')
+def _review_deleted(mapper, connection, target):
+    _apply(target, connection, [(_old_value(target, 'book_id'), _old_value(target, 'rating'), -1)])
+
+@event.listens_for(db.session, 'before_flush')
+def _reset_pending_rebuilds(session, flush_context, instances):
+    # Left over if the previous flush failed
+    session.info.pop(PENDING_REBUILDS, None)
+
+@event.listens_for(db.session, 'after_flush')
+def _rebuild_pending(session, flush_context):
+    work_ids = session.info.pop(PENDING_REBUILDS, None)
+    if not work_ids:
+        return
+    connection = session.connection()
+    computed = compute_rating_summaries(connection, work_ids)
+    for work_id in work_ids:
+        write_rating_summary(connection, work_id, computed.get(work_id))
+
+def _track_history(target, value, oldvalue, initiator):
+    return value
+
+# Load the previous value on assignment so after_update can always see what changed
+for attribute in TRACKED_ATTRIBUTES:
+    event.listen(getattr(Review, attribute), 'set', _track_history, active_history=True, retval=True)
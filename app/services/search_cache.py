@@ -0,0 +1,175 @@
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
+from app.models.search_cache import SearchCacheEntry
+
+def normalize_query(query):
+    """Normalize a search query so equivalent searches share a cache entry"""
+    return ' '.join((query or '').lower().split())
+
+class LRUCache:
+    """Thread-safe in-process cache with a bounded size and per-entry TTL"""
+    
+    def __init__(self, max_size=256, ttl=3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+    
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+    
+    def __len__(self):
+        return len(self._data)
+
+class DatabaseCacheBackend:
+    """Shared cache backend stored in the search_cache table, visible to every worker"""
+    
+    def __init__(self, ttl=3600):
+        self.ttl = ttl
+        self.table = SearchCacheEntry.__table__
+    
+    @staticmethod
+    def _key(query):
+        return hashlib.sha256(query.encode('utf-8')).hexdigest()
+    
+    def get(self, query):
+        # Use a separate connection so cache reads never touch the request session
+        with db.engine.connect() as connection:
+            row = connection.execute(
+                self.table.select().where(
+                    self.table.c.cache_key == self._key(query),
+                    self.table.c.expires_at > datetime.utcnow()
+                )
+            ).first()
+        if row is None:
+            return None
+        return json.loads(row.results)
+    
+    def set(self, query, value):
+        now = datetime.utcnow()
+        key = self._key(query)
+        with db.engine.begin() as connection:
+            connection.execute(self.table.delete().where(
+                (self.table.c.cache_key == key) | (self.table.c.expires_at <= now)
+            ))
+            connection.execute(self.table.insert().values(
+                cache_key=key,
+                query=query[:255],
+                results=json.dumps(value),
+                created_at=now,
+                expires_at=now + timedelta(seconds=self.ttl)
+            ))
+    
+    def clear(self):
+        with db.engine.begin() as connection:
+            connection.execute(self.table.delete())
+
+class SearchCache:
+    """Two-level search result cache: an in-process LRU in front of an optional shared backend"""
+    
+    def __init__(self, max_size=256, ttl=3600, backend=None):
+        self.local = LRUCache(max_size=max_size, ttl=ttl)
+        self.backend = backend
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+    
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+    
+    def get(self, query):
+        """Return cached results for a query, or None on a miss"""
+        key = normalize_query(query)
+        value = self.local.get(key)
+        if value is not None:
+            self._count('hits')
+            return copy.deepcopy(value)
+        
+        if self.backend is not None:
+            try:
+                value = self.backend.get(key)
+            except Exception:
+                current_app.logger.exception('Search cache backend read failed')
+                value = None
+            if value is not None:
+                self.local.set(key, value)
+                self._count('hits')
+                self._count('shared_hits')
+                return copy.deepcopy(value)
+        
+        self._count('misses')
+        return None
+    
+    def set(self, query, value):
+        """Store results for a query in every cache level"""
+        key = normalize_query(query)
+        value = copy.deepcopy(value)
+        self.local.set(key, value)
+        if self.backend is not None:
+            try:
+                self.backend.set(key, value)
+            except Exception:
+                current_app.logger.exception('Search cache backend write failed')
+    
+    def clear(self):
+        self.local.clear()
+        if self.backend is not None:
+            self.backend.clear()
+    
+    def stats(self):
+        """Return hit/miss counters for this worker"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else 0,
+                'size': len(self.local)
+            }
+
+def init_search_cache(app):
+    """Create the search cache configured for this app"""
+    ttl = app.config['SEARCH_CACHE_TTL']
+    backend = None
+    if app.config['SEARCH_CACHE_BACKEND'] == 'database':
+        backend = DatabaseCacheBackend(ttl=ttl)
+    app.extensions['search_cache'] = SearchCache(
+        max_size=app.config['SEARCH_CACHE_SIZE'],
+        ttl=ttl,
+        backend=backend
+    )
+
+def get_search_cache():
+    """Return the search cache for the current app"""
+    return current_app.extensions['search_cache']
@@ -0,0 +1,328 @@
+from datetime import datetime
+from sqlalchemy import event, extract, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import contains_eager, object_session
+from app import db
+from app.models import Book, ReadingProgress, UserStats, UserMonthlyStats, Work
+
+# Reading statuses (including legacy imported values) grouped into the stats buckets
+STATUS_BUCKETS = {
+    'finished': 'read',
+    'read': 'read',
+    'reading': 'reading',
+    'want_to_read': 'to_read',
+    'to-read': 'to_read',
+}
+
+# UserStats counter column for each bucket
+BUCKET_COLUMNS = {
+    'read': 'read_count',
+    'reading': 'reading_count',
+    'to_read': 'to_read_count',
+}
+
+# ReadingProgress attributes that affect the summary
+TRACKED_ATTRIBUTES = ('user_id', 'book_id', 'status', 'end_date')
+
+# Session.info key of the users whose summaries the current flush rebuilds
+PENDING_REBUILDS = 'user_stats_rebuilds'
+
+def empty_user_stats():
+    return {
+        'totals': {'read_count': 0, 'reading_count': 0, 'to_read_count': 0, 'pages_read': 0},
+        'months': {}
+    }
+
+def compute_user_stats(connection, user_ids=None):
+    """Compute summaries from scratch: {user_id: {'totals': {...}, 'months': {(year, month): (count, pages)}}}"""
+    progress = ReadingProgress.__table__
+    books = Book.__table__
+    works = Work.__table__
+    shelved = progress.join(books, books.c.id == progress.c.book_id).join(works, works.c.id == books.c.work_id)
+    
+    def scoped(query):
+        if user_ids is not None:
+            query = query.where(progress.c.user_id.in_(user_ids))
+        return query
+    
+    results = {}
+    def summary(user_id):
+        return results.setdefault(user_id, empty_user_stats())
+    
+    status_rows = connection.execute(scoped(
+        select(progress.c.user_id, progress.c.status, func.count())
+        .group_by(progress.c.user_id, progress.c.status)
+    ))
+    for user_id, status, count in status_rows:
+        bucket = STATUS_BUCKETS.get(status)
+        if bucket:
+            summary(user_id)['totals'][BUCKET_COLUMNS[bucket]] += count
+    
+    finished = progress.c.status.in_([status for status, bucket in STATUS_BUCKETS.items() if bucket == 'read'])
+    page_rows = connection.execute(scoped(
+        select(progress.c.user_id, func.coalesce(func.sum(works.c.page_count), 0))
+        .select_from(shelved)
+        .where(finished)
+        .group_by(progress.c.user_id)
+    ))
+    for user_id, pages in page_rows:
+        summary(user_id)['totals']['pages_read'] = int(pages)
+    
+    year = extract('year', progress.c.end_date)
+    month = extract('month', progress.c.end_date)
+    month_rows = connection.execute(scoped(
+        select(progress.c.user_id, year, month, func.count(), func.coalesce(func.sum(works.c.page_count), 0))
+        .select_from(shelved)
+        .where(finished, progress.c.end_date.isnot(None))
+        .group_by(progress.c.user_id, year, month)
+    ))
+    for user_id, row_year, row_month, count, pages in month_rows:
+        summary(user_id)['months'][(int(row_year), int(row_month))] = (count, int(pages))
+    
+    return results
+
+def write_user_stats(connection, user_id, computed):
+    """Replace a user's summary rows with freshly computed values"""
+    stats_table = UserStats.__table__
+    monthly_table = UserMonthlyStats.__table__
+    
+    connection.execute(stats_table.delete().where(stats_table.c.user_id == user_id))
+    connection.execute(monthly_table.delete().where(monthly_table.c.user_id == user_id))
+    connection.execute(stats_table.insert().values(
+        user_id=user_id, updated_at=datetime.utcnow(), **computed['totals']
+    ))
+    if computed['months']:
+        connection.execute(monthly_table.insert(), [
+            {'user_id': user_id, 'year': year, 'month': month, 'finished_count': count, 'pages_read': pages}
+            for (year, month), (count, pages) in computed['months'].items()
+        ])
+
+def rebuild_user_stats(user_ids=None):
+    """Recompute summaries from reading progress, returning the number of users rebuilt"""
+    with db.engine.begin() as connection:
+        computed = compute_user_stats(connection, user_ids)
+        if user_ids is None:
+            user_ids = [row[0] for row in connection.execute(select(db.metadata.tables['users'].c.id))]
+        for user_id in user_ids:
+            write_user_stats(connection, user_id, computed.get(user_id, empty_user_stats()))
+    return len(user_ids)
+
+def verify_user_stats():
+    """Compare maintained summaries with a from-scratch computation, returning mismatched user ids"""
+    with db.engine.connect() as connection:
+        computed = compute_user_stats(connection)
+        stats_table = UserStats.__table__
+        monthly_table = UserMonthlyStats.__table__
+        
+        stored = {}
+        for row in connection.execute(select(stats_table)):
+            stored.setdefault(row.user_id, empty_user_stats())['totals'] = {
+                column: getattr(row, column) for column in empty_user_stats()['totals']
+            }
+        for row in connection.execute(select(monthly_table)):
+            if row.finished_count or row.pages_read:
+                stored.setdefault(row.user_id, empty_user_stats())['months'][(row.year, row.month)] = (
+                    row.finished_count, row.pages_read
+                )
+    
+    mismatched = []
+    for user_id in sorted(set(computed) | set(stored)):
+        if computed.get(user_id, empty_user_stats()) != stored.get(user_id, empty_user_stats()):
+            mismatched.append(user_id)
+    return mismatched
+
+def get_user_stats(user_id):
+    """Return the UserStats row for a user, building it on first use"""
+    summary = db.session.get(UserStats, user_id)
+    if summary is not None:
+        return summary
+    
+    computed = compute_user_stats(db.session.connection(), [user_id]).get(user_id, empty_user_stats())
+    summary = UserStats(user_id=user_id, **computed['totals'])
+    db.session.add(summary)
+    for (year, month), (count, pages) in computed['months'].items():
+        db.session.add(UserMonthlyStats(
+            user_id=user_id, year=year, month=month, finished_count=count, pages_read=pages
+        ))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another request built it first
+        db.session.rollback()
+        summary = db.session.get(UserStats, user_id)
+    return summary
+
+def get_reading_stats(user_id):
+    """Return a user's counts per reading status from the summary row"""
+    return get_user_stats(user_id).to_dict()
+
+def get_monthly_finished(user_id, start_year, end_year=None):
+    """Return books finished per month between two years (inclusive) from the monthly summary"""
+    end_year = end_year or start_year
+    get_user_stats(user_id)
+    
+    rows = UserMonthlyStats.query.filter(
+        UserMonthlyStats.user_id == user_id,
+        UserMonthlyStats.year >= start_year,
+        UserMonthlyStats.year <= end_year
+    )
+    counts = {(row.year, row.month): row.finished_count for row in rows}
+    
+    monthly_stats = []
+    for stat_year in range(start_year, end_year + 1):
+        for stat_month in range(1, 13):
+            month_start = datetime(stat_year, stat_month, 1)
+            monthly_stats.append({
+                'year': stat_year,
+                'month': month_start.strftime('%b') if start_year == end_year else month_start.strftime('%b %Y'),
+                'count': counts.get((stat_year, stat_month), 0)
+            })
+    return monthly_stats
+
+def get_recently_finished(user_id, limit=5):
+    """Return a user's most recently finished books with their Book rows eager-loaded"""
+    entries = ReadingProgress.query.join(ReadingProgress.book).options(
+        contains_eager(ReadingProgress.book)
+    ).filter(
+        ReadingProgress.user_id == user_id,
+        ReadingProgress.status == 'finished'
+    ).order_by(ReadingProgress.end_date.desc()).limit(limit).all()
+    
+    return [{'book': entry.book, 'date_finished': entry.end_date} for entry in entries]
+
+# Incremental maintenance
+#
+# Each ReadingProgress row contributes +1 to its status bucket and, once finished,
+# its book's pages to the totals and to the month it was finished in. Inserts add
+# the new contribution, deletes subtract the old one, and updates do both.
+
+def _page_count(connection, book_id):
+    books = Book.__table__
+    works = Work.__table__
+    return connection.execute(
+        select(works.c.page_count).select_from(books.join(works, works.c.id == books.c.work_id))
+        .where(books.c.id == book_id)
+    ).scalar() or 0
+
+def _contribution(connection, user_id, book_id, status, end_date):
+    bucket = STATUS_BUCKETS.get(status)
+    totals = {'read_count': 0, 'reading_count': 0, 'to_read_count': 0, 'pages_read': 0}
+    months = {}
+    if bucket:
+        totals[BUCKET_COLUMNS[bucket]] = 1
+    if bucket == 'read':
+        pages = _page_count(connection, book_id)
+        totals['pages_read'] = pages
+        if end_date:
+            months[(end_date.year, end_date.month)] = (1, pages)
+    return user_id, totals, months
+
+def _pending_rebuilds(session):
+    """Users whose summary was missing during this flush; they are rebuilt once the flush has written every row"""
+    return session.info.setdefault(PENDING_REBUILDS, set())
+
+def _apply(target, connection, changes):
+    """Apply (contribution, sign) pairs to the stored summaries"""
+    stats_table = UserStats.__table__
+    monthly_table = UserMonthlyStats.__table__
+    pending = _pending_rebuilds(object_session(target))
+    
+    for (user_id, totals, months), sign in changes:
+        if user_id in pending:
+            continue
+        
+        result = connection.execute(stats_table.update().where(stats_table.c.user_id == user_id).values(
+            updated_at=datetime.utcnow(),
+            **{column: stats_table.c[column] + sign * delta for column, delta in totals.items()}
+        ))
+        if result.rowcount == 0:
+            # No summary yet (or one lost to a crash). One built now would already count the other rows of this
+            # flush, which their own events would then add again, so it is built once the flush is written
+            pending.add(user_id)
+            continue
+        for (year, month), (count, pages) in months.items():
+            key = (
+                (monthly_table.c.user_id == user_id)
+                & (monthly_table.c.year == year)
+                & (monthly_table.c.month == month)
+            )
+            result = connection.execute(monthly_table.update().where(key).values(
+                finished_count=monthly_table.c.finished_count + sign * count,
+                pages_read=monthly_table.c.pages_read + sign * pages
+            ))
+            if result.rowcount == 0:
+                connection.execute(monthly_table.insert().values(
+                    user_id=user_id, year=year, month=month,
+                    finished_count=sign * count, pages_read=sign * pages
+                ))
+
+def _old_value(target, attribute):
+    history = db.inspect(target).attrs[attribute].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(target, attribute)
+
+def _new_contribution(connection, target):
+    return _contribution(connection, target.user_id, target.book_id, target.status, target.end_date)
+
+def _old_contribution(connection, target):
+    return _contribution(connection, *(_old_value(target, attribute) for attribute in TRACKED_ATTRIBUTES))
+
+@event.listens_for(ReadingProgress, 'after_insert')
+def _progress_inserted(mapper, connection, target):
+    _apply(target, connection, [(_new_contribution(connection, target), 1)])
+
+@event.listens_for(ReadingProgress, 'after_update')
+def _progress_updated(mapper, connection, target):
+    state = db.inspect(target)
+    if not any(state.attrs[attribute].history.has_changes() for attribute in TRACKED_ATTRIBUTES):
+        return
+    _apply(target, connection, [
+        (_old_contribution(connection, target), -1),
+        (_new_contribution(connection, target), 1)
+    ])
+
+@event.listens_for(ReadingProgress, 'after_delete')
+def _progress_deleted(mapper, connection, target):
+    _apply(target, connection, [(_old_contribution(connection, target), -1)])
+
+@event.listens_for(Work, 'after_update')
+def _work_updated(mapper, connection, target):
+    # Page counts are shared, so a corrected count changes every reader's pages_read
+    if not db.inspect(target).attrs.page_count.history.has_changes():
+        return
+    progress = ReadingProgress.__table__
+    books = Book.__table__
+    finished = [status for status, bucket in STATUS_BUCKETS.items() if bucket == 'read']
+    user_ids = [row[0] for row in connection.execute(
+        select(progress.c.user_id).distinct()
+        .select_from(progress.join(books, books.c.id == progress.c.book_id))
+        .where(books.c.work_id == target.id, progress.c.status.in_(finished))
+    )]
+    if not user_ids:
+        return
+    computed = compute_user_stats(connection, user_ids)
+    for user_id in user_ids:
+        write_user_stats(connection, user_id, computed.get(user_id, empty_user_stats()))
+
+@event.listens_for(db.session, 'before_flush')
+def _reset_pending_rebuilds(session, flush_context, instances):
+    # Left over if the previous flush failed
+    session.info.pop(PENDING_REBUILDS, None)
+
+@event.listens_for(db.session, 'after_flush')
+def _rebuild_pending(session, flush_context):
+    user_ids = session.info.pop(PENDING_REBUILDS, None)
+    if not user_ids:
+        return
+    connection = session.connection()
+    computed = compute_user_stats(connection, user_ids)
+    for user_id in user_ids:
+        write_user_stats(connection, user_id, computed.get(user_id, empty_user_stats()))
+
+def _track_history(target, value, oldvalue, initiator):
+    return value
+
+# Load the previous value on assignment so after_update can always see what changed
+for attribute in TRACKED_ATTRIBUTES:
+    event.listen(getattr(ReadingProgress, attribute), 'set', _track_history, active_history=True, retval=True)
@@ -0,0 +1,71 @@
+from flask import current_app, session
+from app import db
+from app.models import User
+from app.models.user import AccountMixin
+from app.services.search_cache import LRUCache
+
+# Session key of the identity claims; the session cookie is signed with SECRET_KEY, so clients can't alter them
+CLAIMS_KEY = '_user_claims'
+
+class SessionUser(AccountMixin):
+    """Read-only identity of a signed-in user, shared between requests instead of loaded for each one.
+    
+    Views that change the account load the User row itself.
+    """
+    
+    def __init__(self, id, username, email, profile_pic, date_joined, session_version):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.profile_pic = profile_pic
+        self.date_joined = date_joined
+        self.session_version = session_version
+    
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.username, user.email, user.profile_pic, user.date_joined, user.session_version)
+    
+    def __repr__(self):
+        return f"SessionUser('{self.username}', '{self.email}')"
+
+def cache_user(user):
+    """Cache a user's identity, returning it"""
+    identity = SessionUser.from_user(user)
+    get_user_cache().set(identity.id, identity)
+    return identity
+
+def remember_session_user(user):
+    """Cache a user's identity and write matching claims to the session, returning the cached identity"""
+    identity = cache_user(user)
+    claims = {'id': identity.id, 'username': identity.username, 'version': identity.session_version}
+    if session.get(CLAIMS_KEY) != claims:
+        session[CLAIMS_KEY] = claims
+    return identity
+
+def forget_session_user():
+    session.pop(CLAIMS_KEY, None)
+
+def load_session_user(user_id):
+    """Identity for Flask-Login: from the cache while its version matches the session's claims, else the users table.
+    
+    An account change bumps the version and rewrites the claims of the session that made it, so every worker
+    reloads that session's identity; other sessions of the user pick it up when their cache entry expires.
+    """
+    claims = session.get(CLAIMS_KEY)
+    if claims and claims.get('id') == user_id:
+        identity = get_user_cache().get(user_id)
+        if identity is not None and identity.session_version == claims.get('version'):
+            return identity
+    
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+    return remember_session_user(user)
+
+def init_user_cache(app):
+    """Create the in-process cache of signed-in user identities"""
+    app.extensions['user_cache'] = LRUCache(max_size=app.config['USER_CACHE_SIZE'], ttl=app.config['USER_CACHE_TTL'])
+
+def get_user_cache():
+    """Return the user identity cache for the current app"""
+    return current_app.extensions['user_cache']
@@ -0,0 +1,77 @@
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import Work
+from app.services.google_books import get_google_books_client
+from app.services.jobs import job_handler
+
+# Job fetching a volume's details for a placeholder or stale Work, keyed by google_books_id
+ENRICH_WORK_JOB = 'enrich_work'
+
+def _refresh_work(work, item, refresh):
+    # Search results carry less than the volume details endpoint, so they only replace placeholders and stale data
+    if refresh or work.is_stale(current_app.config['VOLUME_CACHE_MAX_AGE']):
+        work.update_from_api(item)
+
+def _insert_work(item, refresh):
+    """Insert the Work of a volume, or refresh the one a concurrent search or add inserted first"""
+    try:
+        with db.session.begin_nested():
+            work = Work(google_books_id=item['id'])
+            work.update_from_api(item)
+            db.session.add(work)
+    except IntegrityError:
+        work = Work.query.filter_by(google_books_id=item['id']).one()
+        _refresh_work(work, item, refresh)
+    return work
+
+def store_volumes(items, refresh=False):
+    """Insert catalog Works from a list of Google Books volume resources.
+    
+    Existing Works are only updated when stale, unless refresh is set for volumes fetched from the details endpoint.
+    """
+    items = [item for item in items if item.get('id')]
+    if not items:
+        return []
+    
+    ids = {item['id'] for item in items}
+    existing = {
+        work.google_books_id: work
+        for work in Work.query.filter(Work.google_books_id.in_(ids))
+    }
+    
+    works = []
+    for item in items:
+        work = existing.get(item['id'])
+        if work is None:
+            work = _insert_work(item, refresh)
+            existing[item['id']] = work
+        else:
+            _refresh_work(work, item, refresh)
+        works.append(work)
+    
+    db.session.commit()
+    return works
+
+def fetch_volume(google_id):
+    """Fetch a single volume from the Google Books API and store it as a Work, or return None"""
+    data = get_google_books_client().get_volume(google_id)
+    if data is None:
+        return None
+    
+    data['id'] = google_id
+    return store_volumes([data], refresh=True)[0]
+
+@job_handler(ENRICH_WORK_JOB)
+def enrich_work(google_id):
+    """Fetch a volume's details in the background and fill in the library entries added before they arrived"""
+    work = fetch_volume(google_id)
+    if work is None:
+        # Raising makes the queue retry with backoff, then give up
+        raise LookupError(f'Google Books returned no volume for {google_id}')
+    
+    work.refresh_description()
+    for book in work.entries:
+        if not book.categories:
+            book.set_categories(work.categories)
+    db.session.commit()
@@ -103,7 +103,9 @@ document.addEventListener('DOMContentLoaded', function() {
     }
     
     // Handle progress bars - replace inline styles with CSS classes
-    document.querySelectorAll('.progress-bar').forEach(bar => {
+    document.querySelectorAll('.progress-bar').forEach(applyProgressWidth);
+    
+    function applyProgressWidth(bar) {
         // Get the progress percentage from aria-valuenow or data attribute
         let progressPercent = parseInt(bar.getAttribute('aria-valuenow') || 
                               bar.getAttribute('data-progress') || '0');
@@ -133,8 +135,122 @@ document.addEventListener('DOMContentLoaded', function() {
         } else {
             bar.classList.add('progress-width-100');
         }
+    }
+    
+    // Progressive search results: ranked batches stream in as Google Books pages arrive
+    const searchResults = document.getElementById('search-results');
+    if (searchResults && searchResults.dataset.streamUrl) {
+        loadSearchResults(searchResults);
+    }
+    
+    function loadSearchResults(container) {
+        const list = container.querySelector('.search-result-list');
+        const status = container.querySelector('.search-status');
+        let buffer = '';
+        
+        function handleLine(line) {
+            if (!line.trim()) {
+                return;
+            }
+            const message = JSON.parse(line);
+            if (message.error) {
+                status.textContent = message.error;
+            }
+            if (message.results) {
+                message.results.forEach(insertResult);
+                markTopMatches();
+                status.textContent = list.children.length + ' results so far, sorted by relevance...';
+            }
+            if (message.done) {
+                status.textContent = message.count ?
+                    'Results are sorted by relevance to your search query.' :
+                    'No books found. Try a different search term or add a book manually.';
+            }
+        }
+        
+        function insertResult(result) {
+            const template = document.createElement('template');
+            template.innerHTML = result.html.trim();
+            const card = template.content.firstElementChild;
+            card.querySelectorAll('.progress-bar').forEach(applyProgressWidth);
+            
+            // Keep the list sorted by score as batches are merged
+            const score = result.relevance_score;
+            const next = Array.from(list.children).find(child => parseFloat(child.dataset.score) < score);
+            list.insertBefore(card, next || null);
+        }
+        
+        function markTopMatches() {
+            Array.from(list.children).forEach((child, index) => {
+                const top = index < 3;
+                child.querySelector('.book-card').classList.toggle('border-primary', top);
+                child.querySelector('.top-match-badge').classList.toggle('d-none', !top);
+            });
+        }
+        
+        function consume(text) {
+            buffer += text;
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            lines.forEach(handleLine);
+        }
+        
+        fetch(container.dataset.streamUrl, {headers: {'Accept': 'application/x-ndjson'}})
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error('Search failed with status ' + response.status);
+                }
+                if (!response.body || !window.TextDecoder) {
+                    return response.text().then(text => consume(text + '\n'));
+                }
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                function read() {
+                    return reader.read().then(({done, value}) => {
+                        if (done) {
+                            consume(decoder.decode() + '\n');
+                            return;
+                        }
+                        consume(decoder.decode(value, {stream: true}));
+                        return read();
+                    });
+                }
+                return read();
+            })
+            .catch(() => {
+                status.textContent = 'Search failed. Please try again in a moment.';
+            });
+    }
+    
+    // Library imports run in the background: poll the unfinished ones and move their progress bars
+    document.querySelectorAll('.library-import').forEach(item => {
+        if (item.dataset.status === 'pending' || item.dataset.status === 'running') {
+            pollImport(item);
+        }
     });
     
+    function pollImport(item) {
+        const bar = item.querySelector('.progress-bar');
+        const summary = item.querySelector('.import-summary');
+        
+        fetch(item.dataset.statusUrl, {headers: {'Accept': 'application/json'}})
+            .then(response => response.json())
+            .then(status => {
+                bar.setAttribute('aria-valuenow', status.percent);
+                bar.className = bar.className.replace(/\bprogress-width-\d+\b/g, '').trim();
+                applyProgressWidth(bar);
+                summary.textContent = status.processed_rows + ' of ' + status.total_rows + ' rows: ' +
+                    status.imported_count + ' imported, ' + status.skipped_count + ' skipped (' + status.status + ')';
+                if (status.status === 'pending' || status.status === 'running') {
+                    setTimeout(() => pollImport(item), 2000);
+                } else {
+                    // Show the final state, including the resume button of a failed import
+                    window.location.reload();
+                }
+            })
+            .catch(() => setTimeout(() => pollImport(item), 5000));
+    }
+    
     // Toggle mobile menu collapsed state after clicking a nav link (mobile only)
     const navbarToggler = document.querySelector('.navbar-toggler');
     const navbarCollapse = document.querySelector('.navbar-collapse');
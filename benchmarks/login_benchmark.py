@@ -0,0 +1,96 @@
+"""Measure login throughput through the bcrypt hashing pool at several cost settings.
+
+Run from the repository root:
+
+    python benchmarks/login_benchmark.py --costs 10 11 12 13 --concurrency 32 --seconds 10
+
+Every login posts to /login on a throwaway SQLite database, so the numbers include the request handling around the
+bcrypt check. Logins turned away by the pool's back-pressure (503) are counted separately.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def make_app(database_path):
+    os.environ['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{database_path}'
+    # No background job threads competing for the CPU
+    os.environ['JOB_WORKERS'] = '0'
+    from app import create_app, db
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        db.create_all()
+    return app
+
+def set_cost(app, cost):
+    from app.services import get_password_hasher, init_password_hasher
+    with app.app_context():
+        get_password_hasher().shutdown()
+    app.config['BCRYPT_LOG_ROUNDS'] = cost
+    init_password_hasher(app)
+
+def create_user(app, cost):
+    from app import db
+    from app.models import User
+    with app.app_context():
+        user = User(username=f'bench{cost}', email=f'bench{cost}@example.com')
+        user.set_password('benchmark')
+        db.session.add(user)
+        db.session.commit()
+        return user.email
+
+def run_logins(app, email, concurrency, seconds):
+    """Log in from concurrency threads for the given time, returning (logins, rejected, elapsed)"""
+    counts = {'ok': 0, 'busy': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+    
+    def worker():
+        while time.perf_counter() < deadline:
+            response = app.test_client().post('/login', data={'email': email, 'password': 'benchmark'})
+            if response.status_code == 302:
+                outcome = 'ok'
+            elif response.status_code == 503:
+                outcome = 'busy'
+            else:
+                raise RuntimeError(f'Login returned HTTP {response.status_code}')
+            with lock:
+                counts[outcome] += 1
+    
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counts['ok'], counts['busy'], time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--costs', type=int, nargs='+', default=[10, 11, 12, 13], help='bcrypt log rounds to try')
+    parser.add_argument('--concurrency', type=int, default=32, help='simultaneous login attempts')
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as directory:
+        app = make_app(os.path.join(directory, 'benchmark.db'))
+        from app.services import get_password_hasher
+        with app.app_context():
+            cores = min(get_password_hasher().workers, os.cpu_count() or 1)
+        print(f'{args.concurrency} concurrent logins for {args.seconds:g} s each, '
+              f'{app.config["PASSWORD_HASH_WORKERS"] or "one per CPU"} hashing threads on {cores} core(s)')
+        print(f'{"cost":>4} {"logins/s":>10} {"per core":>10} {"rejected":>9}')
+        for cost in args.costs:
+            set_cost(app, cost)
+            email = create_user(app, cost)
+            logins, rejected, elapsed = run_logins(app, email, args.concurrency, args.seconds)
+            rate = logins / elapsed
+            print(f'{cost:>4} {rate:>10.1f} {rate / cores:>10.1f} {rejected:>9}')
+
+if __name__ == '__main__':
+    main()
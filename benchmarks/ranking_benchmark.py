@@ -0,0 +1,100 @@
+"""Compare the batched search ranking engine with the original per-result fuzzy matching.
+
+Run from the repository root:
+
+    python benchmarks/ranking_benchmark.py --results 40 --repeat 200
+"""
+import argparse
+import copy
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.ranking import rank_books
+
+from rapidfuzz import fuzz as rapid_fuzz
+from rapidfuzz import utils as rapid_utils
+
+def rapidfuzz_token_set_ratio(a, b):
+    return rapid_fuzz.token_set_ratio(a, b, processor=rapid_utils.default_process)
+
+# Scalar scorers the original loop can run with; fuzzywuzzy is what the app used to ship
+LEGACY_SCORERS = {'rapidfuzz (scalar)': rapidfuzz_token_set_ratio}
+try:
+    from fuzzywuzzy import fuzz as fuzzywuzzy_fuzz
+    LEGACY_SCORERS['fuzzywuzzy'] = fuzzywuzzy_fuzz.token_set_ratio
+except ImportError:
+    pass
+
+WORDS = (
+    'dune desert planet spice empire house atreides harkonnen prophecy sand worm '
+    'war politics religion ecology family betrayal power destiny water fremen '
+    'science fiction classic novel series saga galaxy emperor guild navigator'
+).split()
+
+def legacy_rank(query, books, token_set_ratio=rapidfuzz_token_set_ratio):
+    """The ranking loop search_google_books used before the batch engine"""
+    for book in books:
+        title_score = token_set_ratio(query.lower(), book['title'].lower())
+        
+        if isinstance(book['authors'], list):
+            authors_text = ', '.join(book['authors'])
+        else:
+            authors_text = book['authors']
+            
+        author_score = token_set_ratio(query.lower(), authors_text.lower())
+        
+        description_score = 0
+        if book['description']:
+            description_score = token_set_ratio(query.lower(), book['description'].lower()) * 0.3
+        
+        book['relevance_score'] = (title_score * 0.6) + (author_score * 0.3) + (description_score * 0.1)
+    
+    books.sort(key=lambda x: x['relevance_score'], reverse=True)
+    return books
+
+def make_books(count, description_words, seed=42):
+    rng = random.Random(seed)
+    books = []
+    for i in range(count):
+        books.append({
+            'id': f'vol{i}',
+            'title': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 6))).title(),
+            'authors': [f'{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}' for _ in range(rng.randint(1, 3))],
+            'description': '<p>' + ' '.join(rng.choice(WORDS) for _ in range(description_words)) + '</p>'
+        })
+    return books
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--query', default='Dune Frank Herbert')
+    parser.add_argument('--results', type=int, default=40, help='search results per query (Google returns up to 40)')
+    parser.add_argument('--description-words', type=int, default=400)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+    
+    books = make_books(args.results, args.description_words)
+    
+    def per_search_ms(rank):
+        elapsed = min(timeit.repeat(lambda: rank(copy.deepcopy(books)), number=args.repeat, repeat=3))
+        return (elapsed - copy_time) / args.repeat * 1000
+    
+    copy_time = min(timeit.repeat(lambda: copy.deepcopy(books), number=args.repeat, repeat=3))
+    batched = rank_books(args.query, copy.deepcopy(books))
+    batched_ms = per_search_ms(lambda candidates: rank_books(args.query, candidates))
+    
+    print(f'{args.results} results, {args.description_words}-word descriptions, {args.repeat} iterations')
+    print(f'{"batched (rapidfuzz cdist)":<28} {batched_ms:8.3f} ms per search')
+    for name, scorer in LEGACY_SCORERS.items():
+        legacy = legacy_rank(args.query, copy.deepcopy(books), scorer)
+        legacy_scores = {book['id']: book['relevance_score'] for book in legacy}
+        max_diff = max(abs(book['relevance_score'] - legacy_scores[book['id']]) for book in batched)
+        legacy_ms = per_search_ms(lambda candidates: legacy_rank(args.query, candidates, scorer))
+        print(f'{"legacy, " + name:<28} {legacy_ms:8.3f} ms per search '
+              f'(batched speedup {legacy_ms / batched_ms:.1f}x, max score difference {max_diff:.2f})')
+
+if __name__ == '__main__':
+    main()
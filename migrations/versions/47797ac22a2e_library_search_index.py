@@ -0,0 +1,73 @@
+"""library search index
+
+Full-text index over each user's books and reviews: an FTS5 virtual table on SQLite, an InnoDB FULLTEXT table on
+MySQL. Databases where the app already created the index on first use keep it as it is.
+
+Revision ID: 47797ac22a2e
+Revises: b37106eaca39
+Create Date: 2026-10-18 09:59:50.666353
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '47797ac22a2e'
+down_revision = 'b37106eaca39'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+    if dialect == 'sqlite':
+        if sa.inspect(bind).has_table('library_fts'):
+            return
+        # owner holds 'u<user_id>' so the user filter is part of the MATCH itself
+        op.execute(
+            "CREATE VIRTUAL TABLE library_fts USING fts5("
+            "owner, title, authors, description, reviews, tokenize = 'unicode61')"
+        )
+        op.execute(
+            "INSERT INTO library_fts (rowid, owner, title, authors, description, reviews) "
+            "SELECT books.id, 'u' || books.user_id, COALESCE(works.title, ''), COALESCE(works.authors, ''), "
+            "COALESCE(works.description, ''), "
+            "COALESCE((SELECT group_concat(reviews.review_text, char(10)) FROM reviews "
+            "WHERE reviews.book_id = books.id AND reviews.review_text IS NOT NULL), '') "
+            "FROM books JOIN works ON works.id = books.work_id"
+        )
+    elif dialect == 'mysql':
+        if sa.inspect(bind).has_table('library_search'):
+            return
+        op.execute(
+            "CREATE TABLE library_search ("
+            "book_id INTEGER NOT NULL PRIMARY KEY, "
+            "user_id INTEGER NOT NULL, "
+            "title VARCHAR(255) NOT NULL, "
+            "authors VARCHAR(255) NOT NULL, "
+            "description TEXT, "
+            "reviews MEDIUMTEXT, "
+            "KEY ix_library_search_user_id (user_id), "
+            "FULLTEXT KEY ft_library_search (title, authors, description, reviews)"
+            ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"
+        )
+        # GROUP_CONCAT stops at 1024 bytes by default; allow as much review text as the column holds
+        op.execute('SET SESSION group_concat_max_len = 16777215')
+        op.execute(
+            "INSERT INTO library_search (book_id, user_id, title, authors, description, reviews) "
+            "SELECT books.id, books.user_id, COALESCE(works.title, ''), COALESCE(works.authors, ''), "
+            "COALESCE(works.description, ''), "
+            "COALESCE((SELECT GROUP_CONCAT(reviews.review_text SEPARATOR '\\n') FROM reviews "
+            "WHERE reviews.book_id = books.id AND reviews.review_text IS NOT NULL), '') "
+            "FROM books JOIN works ON works.id = books.work_id"
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS library_fts')
+    elif dialect == 'mysql':
+        op.execute('DROP TABLE IF EXISTS library_search')
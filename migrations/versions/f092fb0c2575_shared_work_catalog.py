@@ -0,0 +1,154 @@
+"""shared work catalog
+
+Moves book metadata out of the per-user books rows into one works row per
+Google Books volume (manually added books get a work each), replacing the
+volumes cache. Duplicate copies of the same volume collapse into a single
+work; users who shelved a volume twice keep both library entries.
+
+Revision ID: f092fb0c2575
+Revises: 955031572c05
+Create Date: 2026-10-18 08:56:33.527147
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f092fb0c2575'
+down_revision = '955031572c05'
+branch_labels = None
+depends_on = None
+
+# Metadata columns shared by works, volumes and the old books rows
+METADATA_COLUMNS = (
+    'title, authors, description, description_html, description_sanitizer, '
+    'avg_rating, cover_image, published_date, categories, page_count'
+)
+
+# Book metadata columns that move to works
+BOOK_COLUMNS = (
+    'title', 'authors', 'description', 'description_html', 'description_sanitizer',
+    'avg_rating', 'cover_image', 'published_date', 'page_count', 'google_books_id'
+)
+
+HAS_GOOGLE_ID = "google_books_id IS NOT NULL AND google_books_id <> ''"
+
+
+def upgrade():
+    op.create_table('works',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('google_books_id', sa.String(length=50), nullable=True),
+    sa.Column('title', sa.String(length=255), nullable=False),
+    sa.Column('authors', sa.String(length=255), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('description_html', sa.Text(), nullable=True),
+    sa.Column('description_sanitizer', sa.String(length=16), nullable=True),
+    sa.Column('avg_rating', sa.Float(), nullable=True),
+    sa.Column('cover_image', sa.Text(), nullable=True),
+    sa.Column('published_date', sa.String(length=20), nullable=True),
+    sa.Column('categories', sa.Text(), nullable=True),
+    sa.Column('page_count', sa.Integer(), nullable=True),
+    sa.Column('fetched_at', sa.DateTime(), nullable=True),
+    # Links manually added books to their new work during the migration only
+    sa.Column('legacy_book_id', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('google_books_id', name='uq_works_google_books_id')
+    )
+
+    # Cached volumes become works as they are
+    op.execute(
+        f"INSERT INTO works (google_books_id, {METADATA_COLUMNS}, fetched_at) "
+        f"SELECT google_books_id, {METADATA_COLUMNS}, fetched_at FROM volumes"
+    )
+    # Volumes only known from library copies get one work from the newest copy;
+    # a missing fetched_at makes the next add refetch them
+    op.execute(
+        f"INSERT INTO works (google_books_id, {METADATA_COLUMNS}) "
+        f"SELECT google_books_id, {METADATA_COLUMNS} FROM books "
+        f"WHERE id IN (SELECT MAX(id) FROM books WHERE {HAS_GOOGLE_ID} GROUP BY google_books_id) "
+        f"AND google_books_id NOT IN (SELECT google_books_id FROM volumes)"
+    )
+    # Every manually added book gets a work of its own
+    op.execute(
+        f"INSERT INTO works (legacy_book_id, {METADATA_COLUMNS}) "
+        f"SELECT id, {METADATA_COLUMNS} FROM books WHERE NOT ({HAS_GOOGLE_ID})"
+    )
+
+    with op.batch_alter_table('books', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('work_id', sa.Integer(), nullable=True))
+
+    op.execute(
+        "UPDATE books SET work_id = (SELECT works.id FROM works WHERE works.google_books_id = books.google_books_id) "
+        f"WHERE {HAS_GOOGLE_ID}"
+    )
+    op.execute(
+        "UPDATE books SET work_id = (SELECT works.id FROM works WHERE works.legacy_book_id = books.id) "
+        "WHERE work_id IS NULL"
+    )
+
+    with op.batch_alter_table('books', schema=None) as batch_op:
+        batch_op.alter_column('work_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.drop_index('ix_books_google_books_id_user_id')
+        batch_op.create_index('ix_books_work_id_user_id', ['work_id', 'user_id'], unique=False)
+        batch_op.create_foreign_key('fk_books_work_id_works', 'works', ['work_id'], ['id'])
+        for column in BOOK_COLUMNS:
+            batch_op.drop_column(column)
+
+    with op.batch_alter_table('works', schema=None) as batch_op:
+        batch_op.drop_column('legacy_book_id')
+
+    op.drop_table('volumes')
+
+
+def downgrade():
+    op.create_table('volumes',
+    sa.Column('google_books_id', sa.VARCHAR(length=50), nullable=False),
+    sa.Column('title', sa.VARCHAR(length=255), nullable=False),
+    sa.Column('authors', sa.VARCHAR(length=255), nullable=False),
+    sa.Column('description', sa.TEXT(), nullable=True),
+    sa.Column('avg_rating', sa.FLOAT(), nullable=True),
+    sa.Column('cover_image', sa.TEXT(), nullable=True),
+    sa.Column('published_date', sa.VARCHAR(length=20), nullable=True),
+    sa.Column('categories', sa.TEXT(), nullable=True),
+    sa.Column('page_count', sa.INTEGER(), nullable=True),
+    sa.Column('fetched_at', sa.DATETIME(), nullable=False),
+    sa.Column('description_html', sa.TEXT(), nullable=True),
+    sa.Column('description_sanitizer', sa.VARCHAR(length=16), nullable=True),
+    sa.PrimaryKeyConstraint('google_books_id')
+    )
+    op.execute(
+        f"INSERT INTO volumes (google_books_id, {METADATA_COLUMNS}, fetched_at) "
+        f"SELECT google_books_id, {METADATA_COLUMNS}, COALESCE(fetched_at, CURRENT_TIMESTAMP) "
+        f"FROM works WHERE google_books_id IS NOT NULL"
+    )
+
+    with op.batch_alter_table('books', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('description_html', sa.TEXT(), nullable=True))
+        batch_op.add_column(sa.Column('description_sanitizer', sa.VARCHAR(length=16), nullable=True))
+        batch_op.add_column(sa.Column('cover_image', sa.TEXT(), nullable=True))
+        batch_op.add_column(sa.Column('avg_rating', sa.FLOAT(), nullable=True))
+        batch_op.add_column(sa.Column('google_books_id', sa.VARCHAR(length=50), nullable=True))
+        batch_op.add_column(sa.Column('title', sa.VARCHAR(length=255), nullable=True))
+        batch_op.add_column(sa.Column('description', sa.TEXT(), nullable=True))
+        batch_op.add_column(sa.Column('published_date', sa.VARCHAR(length=20), nullable=True))
+        batch_op.add_column(sa.Column('page_count', sa.INTEGER(), nullable=True))
+        batch_op.add_column(sa.Column('authors', sa.VARCHAR(length=255), nullable=True))
+
+    # Copy each work's metadata back onto its library entries
+    op.execute(
+        "UPDATE books SET " + ', '.join(
+            f"{column} = (SELECT works.{column} FROM works WHERE works.id = books.work_id)"
+            for column in BOOK_COLUMNS
+        )
+    )
+
+    with op.batch_alter_table('books', schema=None) as batch_op:
+        batch_op.alter_column('title', existing_type=sa.VARCHAR(length=255), nullable=False)
+        batch_op.alter_column('authors', existing_type=sa.VARCHAR(length=255), nullable=False)
+        batch_op.drop_constraint('fk_books_work_id_works', type_='foreignkey')
+        batch_op.drop_index('ix_books_work_id_user_id')
+        batch_op.create_index('ix_books_google_books_id_user_id', ['google_books_id', 'user_id'], unique=False)
+        batch_op.drop_column('work_id')
+
+    op.drop_table('works')
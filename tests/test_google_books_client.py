@@ -0,0 +1,130 @@
+"""GoogleBooksClient and its circuit breaker against a local stub of the Google Books API.
+
+Run from the repository root:
+
+    python -m unittest discover tests
+"""
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.google_books import CircuitBreaker, CircuitOpenError, GoogleBooksClient
+
+RESET_TIMEOUT = 0.2
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers like Google Books, or fails the way the server's mode says"""
+    
+    def do_GET(self):
+        mode = self.server.mode
+        self.server.requests += 1
+        if mode == 'down':
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = json.dumps({'totalItems': 0, 'items': []}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        if mode == 'corrupt':
+            # Claims gzip but isn't: requests raises ContentDecodingError while reading the body
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+class GoogleBooksClientTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+    
+    def setUp(self):
+        self.server.mode = 'up'
+        self.server.requests = 0
+        self.client = GoogleBooksClient(
+            f'http://127.0.0.1:{self.server.server_address[1]}', max_retries=0, backoff=0,
+            breaker=CircuitBreaker(failure_threshold=2, reset_timeout=RESET_TIMEOUT)
+        )
+    
+    def open_breaker(self):
+        self.server.mode = 'down'
+        for _ in range(2):
+            self.assertEqual(self.client.get('volumes').status_code, 503)
+        self.assertEqual(self.client.breaker.state, 'open')
+    
+    def wait_for_half_open(self):
+        time.sleep(RESET_TIMEOUT + 0.05)
+        self.assertEqual(self.client.breaker.state, 'half_open')
+    
+    def test_search(self):
+        self.assertEqual(self.client.search('dune'), {'totalItems': 0, 'items': []})
+        self.assertEqual(self.client.breaker.state, 'closed')
+    
+    def test_open_half_open_closed(self):
+        self.open_breaker()
+        requests_made = self.server.requests
+        with self.assertRaises(CircuitOpenError):
+            self.client.get('volumes')
+        self.assertEqual(self.server.requests, requests_made)
+        
+        self.wait_for_half_open()
+        self.server.mode = 'up'
+        self.assertEqual(self.client.get('volumes').status_code, 200)
+        self.assertEqual(self.client.breaker.state, 'closed')
+    
+    def test_failed_trial_reopens(self):
+        self.open_breaker()
+        self.wait_for_half_open()
+        self.assertEqual(self.client.get('volumes').status_code, 503)
+        self.assertEqual(self.client.breaker.state, 'open')
+    
+    def test_trial_ending_in_other_request_error_is_recorded(self):
+        self.open_breaker()
+        self.wait_for_half_open()
+        self.server.mode = 'corrupt'
+        with self.assertRaises(requests.exceptions.ContentDecodingError):
+            self.client.get('volumes')
+        self.assertEqual(self.client.breaker.state, 'open')
+        
+        # Once the upstream recovers, the next trial closes the breaker again
+        self.wait_for_half_open()
+        self.server.mode = 'up'
+        self.assertEqual(self.client.get('volumes').status_code, 200)
+        self.assertEqual(self.client.breaker.state, 'closed')
+    
+    def test_trial_ending_in_unrelated_error_is_released(self):
+        self.open_breaker()
+        self.wait_for_half_open()
+        session_get = self.client.session.get
+        
+        def broken_get(*args, **kwargs):
+            raise RuntimeError('not an upstream failure')
+        self.client.session.get = broken_get
+        with self.assertRaises(RuntimeError):
+            self.client.get('volumes')
+        self.client.session.get = session_get
+        
+        self.server.mode = 'up'
+        self.assertEqual(self.client.get('volumes').status_code, 200)
+        self.assertEqual(self.client.breaker.state, 'closed')
+
+if __name__ == '__main__':
+    unittest.main()